@@ -0,0 +1,82 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.authorization import require_permission
+from app.core.config import settings
+from app.core.db_session import DBSession
+from app.core.helpers import APIException, APIResponse
+from app.core.responses import EnvelopeRoute
+from app.enums.status_code import ResponseCode
+from app.models.audit_log import AuditLog
+from app.schemas.audit import AuditLogRead
+from app.schemas.pagination import Page
+
+router = APIRouter(prefix="/audit", tags=["audit"], route_class=EnvelopeRoute)
+
+
+class AuditParams:
+    def __init__(
+        self,
+        limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+        cursor: Optional[int] = Query(None, description="id của phần tử cuối trang trước"),
+        entity_type: Optional[str] = Query(None, max_length=50, description="vd. role, permission"),
+        entity_id: Optional[int] = Query(None),
+        actor: Optional[str] = Query(None, max_length=50),
+        action: Optional[str] = Query(None, max_length=50, description="vd. role.create"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.entity_type = entity_type
+        self.entity_id = entity_id
+        self.actor = actor
+        self.action = action
+
+
+# Mới nhất trước: keyset theo id giảm dần (WHERE id < cursor ORDER BY id DESC)
+@router.get("/", response_model=APIResponse, dependencies=[Depends(require_permission("audit.read"))])
+async def list_audit_logs(params: AuditParams = Depends(), db: AsyncSession = Depends(DBSession.async_dependency)):
+    try:
+        stmt = select(AuditLog)
+        for column in ("entity_type", "entity_id", "actor", "action"):
+            value = getattr(params, column)
+            if value is not None:
+                stmt = stmt.where(getattr(AuditLog, column) == value)
+        if params.cursor is not None:
+            stmt = stmt.where(AuditLog.id < params.cursor)
+        rows = (await db.scalars(stmt.order_by(AuditLog.id.desc()).limit(params.limit + 1))).all()
+        has_more = len(rows) > params.limit
+        rows = rows[:params.limit]
+        return APIResponse(data=Page(
+            items=[AuditLogRead.model_validate(r) for r in rows],
+            next_cursor=rows[-1].id if has_more else None,
+        ))
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+@router.get("/{audit_id}", response_model=APIResponse, dependencies=[Depends(require_permission("audit.read"))])
+async def get_audit_log(audit_id: int, db: AsyncSession = Depends(DBSession.async_dependency)):
+    try:
+        db_log = await db.scalar(select(AuditLog).where(AuditLog.id == audit_id))
+        if not db_log:
+            raise APIException(
+                code=ResponseCode.NOT_FOUND,
+                message="Audit log không tồn tại"
+            )
+        return APIResponse(data=AuditLogRead.model_validate(db_log))
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
@@ -1,39 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserCreate, UserRead
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import create_access_token
+from app.core.password_pool import password_pool
+from app.core.principal_cache import principal_cache
+from app.core.authorization import build_authz_claims
 from app.db.database import SessionLocal
 from app.core.config import settings
 from datetime import timedelta
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from fastapi import Request
 from app.core.helpers import get_current_user
+from app.core.rate_limit import client_ip, enforce_rate_limit
+from app.core.refresh_tokens import RefreshTokenError, refresh_token_store
+from app.schemas.token import RefreshTokenRequest
 from app.core.helpers import APIResponse
+from app.core.responses import EnvelopeRoute
 from app.enums.status_code import ResponseCode
 from app.core.db_session import DBSession
 from app.core.helpers import APIException
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+logger = logging.getLogger(__name__)
 
-http_bearer = HTTPBearer()
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=EnvelopeRoute)
+
+REFRESH_ERRORS = {
+    "missing": "Refresh token đã hết hạn hoặc không tồn tại",
+    "reused": "Refresh token đã được sử dụng, mọi phiên liên quan đã bị thu hồi",
+    "revoked": "Phiên đăng nhập đã bị thu hồi",
+}
 
 # Đăng ký tài khoản
 @router.post("/register", response_model=APIResponse)
-async def register(user: UserCreate, db: Session = Depends(DBSession.dependency)):
+async def register(user: UserCreate, request: Request, db: AsyncSession = Depends(DBSession.async_dependency)):
     try:
-        db_user = db.query(User).filter((User.username == user.username) | (User.email == user.email)).first()
+        await enforce_rate_limit(("register:ip", client_ip(request), settings.rate_limit_register_ip))
+        # username/email là unique trên cả user đã xoá mềm, nên phải kiểm tra cả chúng để không lỗi khi INSERT
+        db_user = await db.scalar(
+            select(User)
+            .where((User.username == user.username) | (User.email == user.email))
+            .execution_options(include_deleted=True)
+        )
         if db_user:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
                 message="Tài khoản đã tồn tại trên hệ thống"
             )
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await password_pool.hash(user.password)
         new_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+        await principal_cache.invalidate(new_user.username)
         return APIResponse(data=UserRead.model_validate(new_user))
     except APIException:
         raise
@@ -46,24 +65,37 @@ async def register(user: UserCreate, db: Session = Depends(DBSession.dependency)
 
 # Đăng nhập
 @router.post("/login")
-async def login(user: UserCreate, db: Session = Depends(DBSession.dependency)):
+async def login(user: UserCreate, request: Request, db: AsyncSession = Depends(DBSession.async_dependency)):
     try:
-        db_user = db.query(User).filter(User.username == user.username).first()
+        await enforce_rate_limit(
+            ("login:ip", client_ip(request), settings.rate_limit_login_ip),
+            ("login:user", user.username.lower(), settings.rate_limit_login_username),
+        )
+        db_user = await db.scalar(select(User).where(User.username == user.username))
         if not db_user or db_user.deleted_at is not None:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
                 message="Tài khoản đã bị khóa hoặc không tồn tại"
             )
-        if not verify_password(user.password, db_user.hashed_password):
+        if not await password_pool.verify(user.password, db_user.hashed_password):
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
                 message="Tài khoản hoặc mật khẩu không chính xác"
             )
+        claims = {"sub": db_user.username}
+        if settings.token_mode == "authz":
+            claims.update(await build_authz_claims(db, db_user.id))
         access_token = create_access_token(
-            data={"sub": db_user.username},
+            data=claims,
             expires_delta=timedelta(minutes=30)
         )
-        return APIResponse(data={"access_token": access_token, "token_type": "bearer"})
+        try:
+            refresh_token = await refresh_token_store.issue(db_user.id, db_user.username)
+        except Exception:
+            # Redis lỗi vẫn cho đăng nhập, chỉ là không có refresh token
+            logger.warning("Không tạo được refresh token", exc_info=True)
+            refresh_token = None
+        return APIResponse(data={"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"})
     except APIException:
         raise
     except Exception:
@@ -73,38 +105,22 @@ async def login(user: UserCreate, db: Session = Depends(DBSession.dependency)):
             data=None
         )
 
-# Làm mới token
+# Làm mới token: đổi refresh token lấy cặp access/refresh token mới, không truy vấn DB ở chế độ basic
 @router.post("/refresh-token")
-async def refresh_token(request: Request, db: Session = Depends(DBSession.dependency)):
+async def refresh_token(body: RefreshTokenRequest, db: AsyncSession = Depends(DBSession.async_dependency)):
     try:
-        token = request.headers.get("authorization")
-        if not token or not token.startswith("Bearer "):
-            raise APIException(
-                code=ResponseCode.UNAUTHORIZED,
-                message="Token không hợp lệ"
-            )
-        token = token.split(" ", 1)[1]
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"], options={"verify_exp": False})
-            username = payload.get("sub")
-            if username is None:
-                raise APIException(
-                    code=ResponseCode.UNAUTHORIZED,
-                    message="Token không hợp lệ"
-                )
-        except JWTError:
-            raise APIException(
-                code=ResponseCode.UNAUTHORIZED,
-                message="Token không hợp lệ"
-            )
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
+            new_refresh_token, user_id, username = await refresh_token_store.rotate(body.refresh_token)
+        except RefreshTokenError as e:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
-                message="Tài khoản không tồn tại"
+                message=REFRESH_ERRORS.get(e.reason, "Refresh token không hợp lệ")
             )
-        new_token = create_access_token(data={"sub": user.username})
-        return APIResponse(data={"access_token": new_token, "token_type": "bearer"})
+        claims = {"sub": username}
+        if settings.token_mode == "authz":
+            claims.update(await build_authz_claims(db, user_id))
+        new_token = create_access_token(data=claims)
+        return APIResponse(data={"access_token": new_token, "refresh_token": new_refresh_token, "token_type": "bearer"})
     except APIException:
         raise
     except Exception:
@@ -114,36 +130,38 @@ async def refresh_token(request: Request, db: Session = Depends(DBSession.depend
             data=None
         )
 
-# Lấy thông tin tài khoản
-@router.get("/me", response_model=UserRead)
-async def me(credentials: HTTPAuthorizationCredentials = Depends(http_bearer), db: Session = Depends(DBSession.dependency)):
+# Đăng xuất phiên hiện tại
+@router.post("/logout", response_model=APIResponse)
+async def logout(body: RefreshTokenRequest):
     try:
-        token = credentials.credentials
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            username = payload.get("sub")
-            if username is None:
-                raise APIException(
-                    code=ResponseCode.UNAUTHORIZED,
-                    message="Token không hợp lệ"
-                )
-        except JWTError:
-            raise APIException(
-                code=ResponseCode.UNAUTHORIZED,
-                message="Token không hợp lệ"
-            )
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            raise APIException(
-                code=ResponseCode.UNAUTHORIZED,
-                message="Tài khoản không tồn tại"
-            )
-        return APIResponse(data=UserRead.model_validate(user))
-    except APIException:
-        raise
+        await refresh_token_store.revoke(body.refresh_token)
+        return APIResponse()
+    except RefreshTokenError:
+        raise APIException(
+            code=ResponseCode.UNAUTHORIZED,
+            message="Refresh token không hợp lệ"
+        )
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+# Đăng xuất mọi phiên của tài khoản (access token đã cấp vẫn dùng được tới khi hết hạn)
+@router.post("/logout-all", response_model=APIResponse)
+async def logout_all(current_user: APIResponse = Depends(get_current_user)):
+    try:
+        await refresh_token_store.revoke_all(current_user.data.id)
+        return APIResponse()
     except Exception:
         raise APIException(
             code=ResponseCode.INTERNAL_ERROR,
             message="Lỗi hệ thống",
             data=None
         )
+
+# Lấy thông tin tài khoản
+@router.get("/me", response_model=APIResponse)
+async def me(current_user: APIResponse = Depends(get_current_user)):
+    return current_user
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.authorization import check_permissions_batch
+from app.core.config import settings
+from app.core.db_session import DBSession
+from app.core.helpers import APIException, APIResponse
+from app.core.responses import EnvelopeRoute
+from app.enums.status_code import ResponseCode
+from app.schemas.authz import AuthzCheckItem, AuthzCheckRequest
+
+router = APIRouter(prefix="/authz", tags=["authz"], route_class=EnvelopeRoute)
+
+# Kiểm tra quyền hàng loạt cho service khác, data là mảng true/false theo đúng thứ tự checks
+@router.post("/check", response_model=APIResponse)
+async def check_permissions(body: AuthzCheckRequest, db: AsyncSession = Depends(DBSession.async_dependency)):
+    try:
+        if len(body.checks) > settings.authz_check_max_items:
+            raise APIException(
+                code=ResponseCode.VALIDATION_ERROR,
+                message=f"Tối đa {settings.authz_check_max_items} phần tử mỗi lần"
+            )
+        checks = []
+        for item in body.checks:
+            if isinstance(item, AuthzCheckItem):
+                user_id, permission, require_all = item.user_id, item.permission, item.mode == "all"
+            else:
+                (user_id, permission), require_all = item, True
+            checks.append((user_id, [permission] if isinstance(permission, str) else permission, require_all))
+        return APIResponse(data=await check_permissions_batch(db, checks))
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from contextlib import aclosing
+from datetime import datetime
+from typing import Literal
+
+import anyio
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db_session import DBSession
+from app.models.permission import Permission
+from app.models.role import Role, role_permissions
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _encode_rows(statement, fields, fmt: ExportFormat):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        yield buffer.getvalue()
+    # aclosing: khi StreamingResponse dừng đọc (client ngắt), stream bên dưới được đóng cùng lúc
+    async with aclosing(DBSession.stream(statement, settings.export_chunk_size)) as chunks:
+        async for rows in chunks:
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([[_encode_value(v) for v in row] for row in rows])
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(fields, (_encode_value(v) for v in row))), ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+
+class ClosingStreamingResponse(StreamingResponse):
+    # Starlette không đóng body_iterator khi client ngắt (task bị huỷ hoặc send lỗi),
+    # generator nằm treo giữ cursor và connection tới khi GC; đóng nó ngay tại đây
+    async def stream_response(self, send):
+        try:
+            await super().stream_response(send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+def _export_response(statement, fields, fmt: ExportFormat, filename: str):
+    return ClosingStreamingResponse(
+        _encode_rows(statement, fields, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+CATALOG_FIELDS = ["id", "name", "description", "created_at", "updated_at", "deleted_at"]
+
+# Xuất toàn bộ permission
+@router.get("/permissions")
+async def export_permissions(format: ExportFormat = Query("ndjson")):
+    statement = select(*(getattr(Permission, f) for f in CATALOG_FIELDS)).order_by(Permission.id).execution_options(include_deleted=True)
+    return _export_response(statement, CATALOG_FIELDS, format, "permissions")
+
+# Xuất toàn bộ role
+@router.get("/roles")
+async def export_roles(format: ExportFormat = Query("ndjson")):
+    statement = select(*(getattr(Role, f) for f in CATALOG_FIELDS)).order_by(Role.id).execution_options(include_deleted=True)
+    return _export_response(statement, CATALOG_FIELDS, format, "roles")
+
+# Xuất bảng gán permission cho role
+@router.get("/role-permissions")
+async def export_role_permissions(format: ExportFormat = Query("ndjson")):
+    statement = select(role_permissions.c.role_id, role_permissions.c.permission_id).order_by(
+        role_permissions.c.role_id, role_permissions.c.permission_id
+    )
+    return _export_response(statement, ["role_id", "permission_id"], format, "role_permissions")
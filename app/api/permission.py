@@ -1,18 +1,29 @@
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.permission import Permission
-from app.schemas.permission import PermissionCreate, PermissionRead, PermissionUpdate
+from app.utils.time import get_vietnam_time
+from app.schemas.permission import PermissionCreate, PermissionRead, PermissionUpdate, PermissionBulkUpdate
+from app.schemas.bulk import BulkDelete
 from app.core.helpers import APIResponse, APIException
+from app.core.responses import EnvelopeRoute
 from app.enums.status_code import ResponseCode
 from app.core.db_session import DBSession
+from app.core.pagination import ListParams, keyset_page
+from app.core.bulk import bulk_create, bulk_update, bulk_delete
+from app.core.catalog_cache import catalog_cache
+from app.core.audit import AuditActor, audit_actor, audit_log, bulk_entries
+from app.core.etag import PERMISSIONS, ROLE_PERMISSIONS, check_etag
 from typing import List
 
-router = APIRouter(prefix="/permission", tags=["permission"])
+router = APIRouter(prefix="/permission", tags=["permission"], route_class=EnvelopeRoute)
 
 @router.post("/", response_model=APIResponse)
-async def create_permission(permission: PermissionCreate, db: Session = Depends(DBSession.dependency)):
+async def create_permission(permission: PermissionCreate, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_permission = db.query(Permission).filter(Permission.name == permission.name).first()
+        db_permission = await db.scalar(
+            select(Permission).where(Permission.name == permission.name).execution_options(include_deleted=True)
+        )
         if db_permission:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
@@ -20,8 +31,10 @@ async def create_permission(permission: PermissionCreate, db: Session = Depends(
             )
         new_permission = Permission(name=permission.name, description=permission.description)
         db.add(new_permission)
-        db.commit()
-        db.refresh(new_permission)
+        await db.commit()
+        await db.refresh(new_permission)
+        await catalog_cache.invalidate(PERMISSIONS)
+        await audit_log.record("permission.create", "permission", new_permission.id, actor, permission.model_dump())
         return APIResponse(data=PermissionRead.model_validate(new_permission))
     except APIException:
         raise
@@ -32,11 +45,66 @@ async def create_permission(permission: PermissionCreate, db: Session = Depends(
             data=None
         )
 
+@router.post("/bulk", response_model=APIResponse)
+async def bulk_create_permissions(items: List[PermissionCreate], db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        results = await bulk_create(db, Permission, items)
+        await db.commit()
+        await catalog_cache.invalidate(PERMISSIONS)
+        await audit_log.record_many("permission.create", "permission", bulk_entries(results, "created", items), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+@router.put("/bulk", response_model=APIResponse)
+async def bulk_update_permissions(items: List[PermissionBulkUpdate], db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        results = await bulk_update(db, Permission, items)
+        await db.commit()
+        await catalog_cache.invalidate(PERMISSIONS, ROLE_PERMISSIONS)
+        await audit_log.record_many("permission.update", "permission", bulk_entries(results, "updated", items), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+@router.post("/bulk/delete", response_model=APIResponse)
+async def bulk_delete_permissions(body: BulkDelete, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        results = await bulk_delete(db, Permission, body.ids)
+        await db.commit()
+        await catalog_cache.invalidate(PERMISSIONS, ROLE_PERMISSIONS)
+        await audit_log.record_many("permission.delete", "permission", bulk_entries(results, "deleted"), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
 @router.get("/", response_model=APIResponse)
-async def list_permissions(db: Session = Depends(DBSession.dependency)):
+async def list_permissions(request: Request, response: Response, params: ListParams = Depends(), db: AsyncSession = Depends(DBSession.primary_async_dependency)):
     try:
-        permissions = db.query(Permission).all()
-        return APIResponse(data=[PermissionRead.model_validate(p) for p in permissions])
+        not_modified, versions = await check_etag(request, response, PERMISSIONS)
+        if not_modified:
+            return not_modified
+        async def load():
+            return (await keyset_page(db, Permission, PermissionRead, params)).model_dump()
+        return APIResponse(data=await catalog_cache.get(PERMISSIONS, params.cache_key(), load, version=versions.get(PERMISSIONS)))
     except Exception:
         raise APIException(
             code=ResponseCode.INTERNAL_ERROR,
@@ -45,15 +113,18 @@ async def list_permissions(db: Session = Depends(DBSession.dependency)):
         )
 
 @router.get("/{permission_id}", response_model=APIResponse)
-async def get_permission(permission_id: int, db: Session = Depends(DBSession.dependency)):
+async def get_permission(permission_id: int, db: AsyncSession = Depends(DBSession.primary_async_dependency)):
     try:
-        permission = db.query(Permission).filter(Permission.id == permission_id).first()
-        if not permission:
+        async def load():
+            permission = await db.scalar(select(Permission).where(Permission.id == permission_id))
+            return PermissionRead.model_validate(permission).model_dump() if permission else None
+        permission = await catalog_cache.get(PERMISSIONS, f"item:{permission_id}", load)
+        if permission is None:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
                 message="Permission không tồn tại"
             )
-        return APIResponse(data=PermissionRead.model_validate(permission))
+        return APIResponse(data=permission)
     except APIException:
         raise
     except Exception:
@@ -64,9 +135,9 @@ async def get_permission(permission_id: int, db: Session = Depends(DBSession.dep
         )
 
 @router.put("/{permission_id}", response_model=APIResponse)
-async def update_permission(permission_id: int, permission: PermissionUpdate, db: Session = Depends(DBSession.dependency)):
+async def update_permission(permission_id: int, permission: PermissionUpdate, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_permission = db.query(Permission).filter(Permission.id == permission_id).first()
+        db_permission = await db.scalar(select(Permission).where(Permission.id == permission_id))
         if not db_permission:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
@@ -74,8 +145,10 @@ async def update_permission(permission_id: int, permission: PermissionUpdate, db
             )
         db_permission.name = permission.name  # type: ignore
         db_permission.description = permission.description  # type: ignore
-        db.commit()
-        db.refresh(db_permission)
+        await db.commit()
+        await db.refresh(db_permission)
+        await catalog_cache.invalidate(PERMISSIONS, ROLE_PERMISSIONS)
+        await audit_log.record("permission.update", "permission", permission_id, actor, permission.model_dump())
         return APIResponse(data=PermissionRead.model_validate(db_permission))
     except APIException:
         raise
@@ -87,16 +160,18 @@ async def update_permission(permission_id: int, permission: PermissionUpdate, db
         )
 
 @router.delete("/{permission_id}", response_model=APIResponse)
-async def delete_permission(permission_id: int, db: Session = Depends(DBSession.dependency)):
+async def delete_permission(permission_id: int, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_permission = db.query(Permission).filter(Permission.id == permission_id).first()
+        db_permission = await db.scalar(select(Permission).where(Permission.id == permission_id))
         if not db_permission:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
                 message="Permission không tồn tại"
             )
-        db.delete(db_permission)
-        db.commit()
+        db_permission.deleted_at = get_vietnam_time()  # type: ignore
+        await db.commit()
+        await catalog_cache.invalidate(PERMISSIONS, ROLE_PERMISSIONS)
+        await audit_log.record("permission.delete", "permission", permission_id, actor)
         return APIResponse(data=True)
     except APIException:
         raise
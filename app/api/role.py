@@ -1,20 +1,40 @@
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
-from app.models.role import Role
-from app.schemas.role import RoleCreate, RoleRead, RoleUpdate
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.role import Role, role_parents, role_permissions
+from app.utils.time import get_vietnam_time
+from app.schemas.role import RoleCreate, RoleRead, RoleUpdate, RoleBulkUpdate, RolePermissionsUpdate
+from app.schemas.bulk import BulkDelete
 from app.core.helpers import APIResponse, APIException
+from app.core.responses import EnvelopeRoute
 from app.enums.status_code import ResponseCode
 from app.core.db_session import DBSession
+from app.core.pagination import ListParams, keyset_page
+from app.core.authorization import permission_resolver
+from app.core.bulk import bulk_create, bulk_update, bulk_delete, check_bulk_size
+from app.core.catalog_cache import catalog_cache
+from app.core import role_hierarchy
+from app.core.audit import AuditActor, audit_actor, audit_log, bulk_entries
+from app.core.etag import PERMISSIONS, ROLES, ROLE_PERMISSIONS, check_etag
 from typing import List
 from app.models.permission import Permission
 from app.schemas.permission import PermissionRead
 
-router = APIRouter(prefix="/role", tags=["role"])
+router = APIRouter(prefix="/role", tags=["role"], route_class=EnvelopeRoute)
+
+async def get_role_permissions(db: AsyncSession, role_id: int):
+    # Truy vấn trực tiếp thay vì lazy-load role.permissions (không dùng được với AsyncSession)
+    permissions = await db.scalars(
+        select(Permission)
+        .join(role_permissions, role_permissions.c.permission_id == Permission.id)
+        .where(role_permissions.c.role_id == role_id)
+    )
+    return [PermissionRead.model_validate(p) for p in permissions.all()]
 
 @router.post("/", response_model=APIResponse)
-async def create_role(role: RoleCreate, db: Session = Depends(DBSession.dependency)):
+async def create_role(role: RoleCreate, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_role = db.query(Role).filter(Role.name == role.name).first()
+        db_role = await db.scalar(select(Role).where(Role.name == role.name).execution_options(include_deleted=True))
         if db_role:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
@@ -22,8 +42,12 @@ async def create_role(role: RoleCreate, db: Session = Depends(DBSession.dependen
             )
         new_role = Role(name=role.name, description=role.description)
         db.add(new_role)
-        db.commit()
-        db.refresh(new_role)
+        await db.flush()
+        await role_hierarchy.add_roles(db, [new_role.id])
+        await db.commit()
+        await db.refresh(new_role)
+        await catalog_cache.invalidate(ROLES)
+        await audit_log.record("role.create", "role", new_role.id, actor, role.model_dump())
         return APIResponse(data=RoleRead.model_validate(new_role))
     except APIException:
         raise
@@ -34,11 +58,74 @@ async def create_role(role: RoleCreate, db: Session = Depends(DBSession.dependen
             data=None
         )
 
+@router.post("/bulk", response_model=APIResponse)
+async def bulk_create_roles(items: List[RoleCreate], db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        results = await bulk_create(db, Role, items)
+        await role_hierarchy.add_roles(db, [r.id for r in results if r.status == "created"])
+        await db.commit()
+        await catalog_cache.invalidate(ROLES)
+        await audit_log.record_many("role.create", "role", bulk_entries(results, "created", items), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+@router.put("/bulk", response_model=APIResponse)
+async def bulk_update_roles(items: List[RoleBulkUpdate], db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        results = await bulk_update(db, Role, items)
+        await db.commit()
+        await catalog_cache.invalidate(ROLES)
+        await audit_log.record_many("role.update", "role", bulk_entries(results, "updated", items), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+@router.post("/bulk/delete", response_model=APIResponse)
+async def bulk_delete_roles(body: BulkDelete, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        # Từ chối yêu cầu quá lớn trước mọi truy vấn DB/Redis (users_of_roles chạy IN trên toàn bộ ids)
+        check_bulk_size(body.ids)
+        # Giữ khoá từ trước lần đọc đầu tiên để transaction (REPEATABLE READ) thấy closure mới nhất
+        async with role_hierarchy.hierarchy_lock():
+            affected_users = await permission_resolver.users_of_roles(db, *body.ids)
+            results = await bulk_delete(db, Role, body.ids)
+            await role_hierarchy.detach(db, [r.id for r in results if r.status == "deleted"])
+            await db.commit()
+        await catalog_cache.invalidate(ROLES, ROLE_PERMISSIONS)
+        await permission_resolver.invalidate_users(*affected_users)
+        await audit_log.record_many("role.delete", "role", bulk_entries(results, "deleted"), actor)
+        return APIResponse(data=results)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
 @router.get("/", response_model=APIResponse)
-async def list_roles(db: Session = Depends(DBSession.dependency)):
+async def list_roles(request: Request, response: Response, params: ListParams = Depends(), db: AsyncSession = Depends(DBSession.primary_async_dependency)):
     try:
-        roles = db.query(Role).all()
-        return APIResponse(data=[RoleRead.model_validate(r) for r in roles])
+        not_modified, versions = await check_etag(request, response, ROLES)
+        if not_modified:
+            return not_modified
+        async def load():
+            return (await keyset_page(db, Role, RoleRead, params)).model_dump()
+        return APIResponse(data=await catalog_cache.get(ROLES, params.cache_key(), load, version=versions.get(ROLES)))
     except Exception:
         raise APIException(
             code=ResponseCode.INTERNAL_ERROR,
@@ -47,15 +134,18 @@ async def list_roles(db: Session = Depends(DBSession.dependency)):
         )
 
 @router.get("/{role_id}", response_model=APIResponse)
-async def get_role(role_id: int, db: Session = Depends(DBSession.dependency)):
+async def get_role(role_id: int, db: AsyncSession = Depends(DBSession.primary_async_dependency)):
     try:
-        role = db.query(Role).filter(Role.id == role_id).first()
-        if not role:
+        async def load():
+            role = await db.scalar(select(Role).where(Role.id == role_id))
+            return RoleRead.model_validate(role).model_dump() if role else None
+        role = await catalog_cache.get(ROLES, f"item:{role_id}", load)
+        if role is None:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
                 message="Role không tồn tại"
             )
-        return APIResponse(data=RoleRead.model_validate(role))
+        return APIResponse(data=role)
     except APIException:
         raise
     except Exception:
@@ -66,9 +156,9 @@ async def get_role(role_id: int, db: Session = Depends(DBSession.dependency)):
         )
 
 @router.put("/{role_id}", response_model=APIResponse)
-async def update_role(role_id: int, role: RoleUpdate, db: Session = Depends(DBSession.dependency)):
+async def update_role(role_id: int, role: RoleUpdate, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_role = db.query(Role).filter(Role.id == role_id).first()
+        db_role = await db.scalar(select(Role).where(Role.id == role_id))
         if not db_role:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
@@ -76,8 +166,10 @@ async def update_role(role_id: int, role: RoleUpdate, db: Session = Depends(DBSe
             )
         db_role.name = role.name  # type: ignore
         db_role.description = role.description  # type: ignore
-        db.commit()
-        db.refresh(db_role)
+        await db.commit()
+        await db.refresh(db_role)
+        await catalog_cache.invalidate(ROLES)
+        await audit_log.record("role.update", "role", role_id, actor, role.model_dump())
         return APIResponse(data=RoleRead.model_validate(db_role))
     except APIException:
         raise
@@ -89,16 +181,22 @@ async def update_role(role_id: int, role: RoleUpdate, db: Session = Depends(DBSe
         )
 
 @router.delete("/{role_id}", response_model=APIResponse)
-async def delete_role(role_id: int, db: Session = Depends(DBSession.dependency)):
+async def delete_role(role_id: int, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        db_role = db.query(Role).filter(Role.id == role_id).first()
-        if not db_role:
-            raise APIException(
-                code=ResponseCode.NOT_FOUND,
-                message="Role không tồn tại"
-            )
-        db.delete(db_role)
-        db.commit()
+        async with role_hierarchy.hierarchy_lock():
+            db_role = await db.scalar(select(Role).where(Role.id == role_id))
+            if not db_role:
+                raise APIException(
+                    code=ResponseCode.NOT_FOUND,
+                    message="Role không tồn tại"
+                )
+            affected_users = await permission_resolver.users_of_roles(db, role_id)
+            db_role.deleted_at = get_vietnam_time()  # type: ignore
+            await role_hierarchy.detach(db, [role_id])
+            await db.commit()
+        await catalog_cache.invalidate(ROLES, ROLE_PERMISSIONS)
+        await permission_resolver.invalidate_users(*affected_users)
+        await audit_log.record("role.delete", "role", role_id, actor)
         return APIResponse(data=True)
     except APIException:
         raise
@@ -109,31 +207,44 @@ async def delete_role(role_id: int, db: Session = Depends(DBSession.dependency))
             data=None
         )
 
+async def get_assigned_permission_ids(db: AsyncSession, role_id: int, permission_ids=None):
+    # Chỉ đọc cột permission_id trong role_permissions, giới hạn theo danh sách id nếu có
+    stmt = select(role_permissions.c.permission_id).where(role_permissions.c.role_id == role_id)
+    if permission_ids is not None:
+        stmt = stmt.where(role_permissions.c.permission_id.in_(permission_ids))
+    return set((await db.scalars(stmt)).all())
+
+async def ensure_role_exists(db: AsyncSession, role_id: int):
+    if await db.scalar(select(Role.id).where(Role.id == role_id)) is None:
+        raise APIException(
+            code=ResponseCode.NOT_FOUND,
+            message="Role không tồn tại"
+        )
+
+async def ensure_permission_exists(db: AsyncSession, permission_id: int):
+    if await db.scalar(select(Permission.id).where(Permission.id == permission_id)) is None:
+        raise APIException(
+            code=ResponseCode.NOT_FOUND,
+            message="Permission không tồn tại"
+        )
+
 # Gán permission cho role
 @router.post("/{role_id}/permissions/{permission_id}", response_model=APIResponse)
-async def add_permission_to_role(role_id: int, permission_id: int, db: Session = Depends(DBSession.dependency)):
+async def add_permission_to_role(role_id: int, permission_id: int, return_permissions: bool = True, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        role = db.query(Role).filter(Role.id == role_id).first()
-        if not role:
-            raise APIException(
-                code=ResponseCode.NOT_FOUND,
-                message="Role không tồn tại"
-            )
-        permission = db.query(Permission).filter(Permission.id == permission_id).first()
-        if not permission:
-            raise APIException(
-                code=ResponseCode.NOT_FOUND,
-                message="Permission không tồn tại"
-            )
-        if permission in role.permissions:
+        await ensure_role_exists(db, role_id)
+        await ensure_permission_exists(db, permission_id)
+        if await get_assigned_permission_ids(db, role_id, [permission_id]):
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
                 message="Permission đã được gán cho role này"
             )
-        role.permissions.append(permission)
-        db.commit()
-        db.refresh(role)
-        return APIResponse(data=[PermissionRead.model_validate(p) for p in role.permissions])
+        await db.execute(insert(role_permissions).values(role_id=role_id, permission_id=permission_id))
+        await db.commit()
+        await catalog_cache.invalidate(ROLE_PERMISSIONS)
+        await permission_resolver.invalidate_roles(db, role_id)
+        await audit_log.record("role.permission.add", "role", role_id, actor, {"permission_ids": [permission_id]})
+        return APIResponse(data=await get_role_permissions(db, role_id) if return_permissions else True)
     except APIException:
         raise
     except Exception:
@@ -145,29 +256,76 @@ async def add_permission_to_role(role_id: int, permission_id: int, db: Session =
 
 # Huỷ gán permission khỏi role
 @router.delete("/{role_id}/permissions/{permission_id}", response_model=APIResponse)
-async def remove_permission_from_role(role_id: int, permission_id: int, db: Session = Depends(DBSession.dependency)):
+async def remove_permission_from_role(role_id: int, permission_id: int, return_permissions: bool = True, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
     try:
-        role = db.query(Role).filter(Role.id == role_id).first()
-        if not role:
-            raise APIException(
-                code=ResponseCode.NOT_FOUND,
-                message="Role không tồn tại"
+        await ensure_role_exists(db, role_id)
+        await ensure_permission_exists(db, permission_id)
+        result = await db.execute(
+            delete(role_permissions).where(
+                role_permissions.c.role_id == role_id,
+                role_permissions.c.permission_id == permission_id,
             )
-        permission = db.query(Permission).filter(Permission.id == permission_id).first()
-        if not permission:
-            raise APIException(
-                code=ResponseCode.NOT_FOUND,
-                message="Permission không tồn tại"
-            )
-        if permission not in role.permissions:
+        )
+        if result.rowcount == 0:
             raise APIException(
                 code=ResponseCode.UNAUTHORIZED,
                 message="Permission chưa được gán cho role này"
             )
-        role.permissions.remove(permission)
-        db.commit()
-        db.refresh(role)
-        return APIResponse(data=[PermissionRead.model_validate(p) for p in role.permissions])
+        await db.commit()
+        await catalog_cache.invalidate(ROLE_PERMISSIONS)
+        await permission_resolver.invalidate_roles(db, role_id)
+        await audit_log.record("role.permission.remove", "role", role_id, actor, {"permission_ids": [permission_id]})
+        return APIResponse(data=await get_role_permissions(db, role_id) if return_permissions else True)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+# Cập nhật tập permission của role: replace / add / remove theo danh sách id
+@router.put("/{role_id}/permissions", response_model=APIResponse)
+async def set_permissions_of_role(role_id: int, body: RolePermissionsUpdate, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        check_bulk_size(body.permission_ids)
+        await ensure_role_exists(db, role_id)
+        requested = set(body.permission_ids)
+        valid = set((await db.scalars(select(Permission.id).where(Permission.id.in_(requested)))).all()) if requested else set()
+        if body.mode == "replace":
+            current = await get_assigned_permission_ids(db, role_id)
+            to_add, to_remove = valid - current, current - valid
+        else:
+            current = await get_assigned_permission_ids(db, role_id, valid) if valid else set()
+            to_add = valid - current if body.mode == "add" else set()
+            to_remove = current if body.mode == "remove" else set()
+        if to_remove:
+            await db.execute(
+                delete(role_permissions).where(
+                    role_permissions.c.role_id == role_id,
+                    role_permissions.c.permission_id.in_(to_remove),
+                )
+            )
+        if to_add:
+            await db.execute(insert(role_permissions).values([{"role_id": role_id, "permission_id": i} for i in sorted(to_add)]))
+        await db.commit()
+        if to_add or to_remove:
+            await catalog_cache.invalidate(ROLE_PERMISSIONS)
+            await permission_resolver.invalidate_roles(db, role_id)
+            await audit_log.record("role.permission.set", "role", role_id, actor, {
+                "mode": body.mode,
+                "added": sorted(to_add),
+                "removed": sorted(to_remove),
+            })
+        data = {
+            "added": sorted(to_add),
+            "removed": sorted(to_remove),
+            "not_found": sorted(requested - valid),
+        }
+        if body.return_permissions:
+            data["permissions"] = await get_role_permissions(db, role_id)
+        return APIResponse(data=data)
     except APIException:
         raise
     except Exception:
@@ -179,15 +337,67 @@ async def remove_permission_from_role(role_id: int, permission_id: int, db: Sess
 
 # Lấy danh sách permission của role
 @router.get("/{role_id}/permissions", response_model=APIResponse)
-async def get_permissions_of_role(role_id: int, db: Session = Depends(DBSession.dependency)):
+async def get_permissions_of_role(role_id: int, request: Request, response: Response, db: AsyncSession = Depends(DBSession.primary_async_dependency)):
     try:
-        role = db.query(Role).filter(Role.id == role_id).first()
-        if not role:
+        # Phụ thuộc cả role (tồn tại), liên kết và nội dung permission
+        not_modified, versions = await check_etag(request, response, ROLES, PERMISSIONS, ROLE_PERMISSIONS)
+        if not_modified:
+            return not_modified
+        async def load():
+            if await db.scalar(select(Role.id).where(Role.id == role_id)) is None:
+                return None
+            return [p.model_dump() for p in await get_role_permissions(db, role_id)]
+        # Không cache kết quả "không tồn tại" vì tạo role chỉ invalidate namespace roles
+        permissions = await catalog_cache.get(ROLE_PERMISSIONS, f"role:{role_id}", load, cache_none=False, version=versions.get(ROLE_PERMISSIONS))
+        if permissions is None:
             raise APIException(
                 code=ResponseCode.NOT_FOUND,
                 message="Role không tồn tại"
             )
-        return APIResponse(data=[PermissionRead.model_validate(p) for p in role.permissions])
+        return APIResponse(data=permissions)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        ) 
+
+# Lấy danh sách role cha trực tiếp của role
+@router.get("/{role_id}/parents", response_model=APIResponse)
+async def get_parents_of_role(role_id: int, db: AsyncSession = Depends(DBSession.async_dependency)):
+    try:
+        await ensure_role_exists(db, role_id)
+        parents = await db.scalars(
+            select(Role)
+            .join(role_parents, role_parents.c.parent_id == Role.id)
+            .where(role_parents.c.role_id == role_id)
+            .order_by(Role.id)
+        )
+        return APIResponse(data=[RoleRead.model_validate(r) for r in parents.all()])
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
+
+# Cho role kế thừa toàn bộ quyền của role cha
+@router.post("/{role_id}/parents/{parent_id}", response_model=APIResponse)
+async def add_parent_to_role(role_id: int, parent_id: int, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        # Kiểm tra vòng và ghi cạnh phải nằm trong cùng khoá, nếu không hai request song song có thể khép vòng
+        async with role_hierarchy.hierarchy_lock():
+            await ensure_role_exists(db, role_id)
+            await ensure_role_exists(db, parent_id)
+            await role_hierarchy.add_parent(db, role_id, parent_id)
+            await db.commit()
+        await permission_resolver.invalidate_roles(db, role_id)
+        await audit_log.record("role.parent.add", "role", role_id, actor, {"parent_id": parent_id})
+        return APIResponse(data=True)
     except APIException:
         raise
     except Exception:
@@ -195,4 +405,24 @@ async def get_permissions_of_role(role_id: int, db: Session = Depends(DBSession.
             code=ResponseCode.INTERNAL_ERROR,
             message="Lỗi hệ thống",
             data=None
-        ) 
\ No newline at end of file
+        )
+
+# Bỏ kế thừa từ role cha
+@router.delete("/{role_id}/parents/{parent_id}", response_model=APIResponse)
+async def remove_parent_from_role(role_id: int, parent_id: int, db: AsyncSession = Depends(DBSession.async_dependency), actor: AuditActor = Depends(audit_actor)):
+    try:
+        async with role_hierarchy.hierarchy_lock():
+            await ensure_role_exists(db, role_id)
+            await role_hierarchy.remove_parent(db, role_id, parent_id)
+            await db.commit()
+        await permission_resolver.invalidate_roles(db, role_id)
+        await audit_log.record("role.parent.remove", "role", role_id, actor, {"parent_id": parent_id})
+        return APIResponse(data=True)
+    except APIException:
+        raise
+    except Exception:
+        raise APIException(
+            code=ResponseCode.INTERNAL_ERROR,
+            message="Lỗi hệ thống",
+            data=None
+        )
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.helpers import APIResponse
+from app.core.responses import EnvelopeRoute
+from app.core.metrics import CONTENT_TYPE_LATEST, render_prometheus
+from app.db.pool import pool_stats
+
+router = APIRouter(tags=["system"], route_class=EnvelopeRoute)
+
+# Thống kê connection pool của từng engine
+@router.get("/system/pool", response_model=APIResponse)
+async def get_pool_stats():
+    return APIResponse(data=pool_stats())
+
+# Xuất metrics theo định dạng text của Prometheus
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    pool_stats()  # cập nhật các gauge của connection pool trước khi xuất
+    return Response(content=render_prometheus(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.security import key_ring
+
+router = APIRouter(prefix="/.well-known", tags=["well-known"])
+
+# Khoá public để các service khác tự xác thực access token (RFC 7517)
+@router.get("/jwks.json")
+async def jwks():
+    return JSONResponse(
+        content=key_ring.jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.jwks_max_age}"},
+    )
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, Optional
+
+from fastapi import Request
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.helpers import APIException, authenticate
+from app.core.metrics import Counter, Gauge
+from app.core.rate_limit import client_ip
+from app.db.database import engine
+from app.models.audit_log import AuditLog
+from app.utils.time import get_vietnam_time
+
+logger = logging.getLogger(__name__)
+
+AUDIT_EVENTS = Counter("audit_events_total", "Số sự kiện audit theo kết quả written/dropped/failed", ["result"])
+AUDIT_QUEUE_DEPTH = Gauge("audit_queue_depth", "Số sự kiện audit đang chờ ghi")
+
+
+class AuditActor:
+    def __init__(self, actor: Optional[str], ip: Optional[str]):
+        self.actor = actor
+        self.ip = ip
+
+
+async def audit_actor(request: Request) -> AuditActor:
+    # Người thực hiện lấy từ Bearer token nếu có và hợp lệ; các API ghi hiện không bắt buộc đăng nhập
+    actor = None
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            actor = authenticate(token)["sub"]
+        except APIException:
+            pass
+    return AuditActor(actor, client_ip(request))
+
+
+class AuditLogger:
+    """Ghi audit log bất đồng bộ theo lô.
+
+    Handler chỉ đẩy sự kiện vào hàng đợi có giới hạn trong process rồi trả về ngay;
+    một task nền gom sự kiện và ghi bằng một câu INSERT nhiều dòng mỗi khi đủ
+    ``batch_size`` sự kiện hoặc sau ``flush_interval`` giây kể từ sự kiện đầu lô.
+    Khi hàng đợi đầy, ``record`` chờ tối đa ``put_timeout`` giây (backpressure) rồi
+    bỏ sự kiện. ``stop`` ghi hết các sự kiện còn lại trước khi tắt.
+    """
+
+    def __init__(self, bind, max_queue: int, batch_size: int, flush_interval: float, put_timeout: float, enabled: bool = True):
+        self.bind = bind
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.enabled = enabled
+        self._queue = None
+        self._worker = None
+        self._flushing = None
+
+    def _ensure_started(self):
+        # Tạo hàng đợi/worker trong event loop đang chạy (lifespan hoặc lần ghi đầu tiên)
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def start(self):
+        if self.enabled:
+            self._ensure_started()
+
+    async def record(self, action: str, entity_type: str, entity_id: Optional[int] = None, actor: Optional[AuditActor] = None, detail=None):
+        await self.record_many(action, entity_type, [(entity_id, detail)], actor)
+
+    async def record_many(self, action: str, entity_type: str, entries: Iterable[tuple], actor: Optional[AuditActor] = None):
+        # entries: các cặp (entity_id, detail), dùng cho API bulk
+        if not self.enabled:
+            return
+        self._ensure_started()
+        now = get_vietnam_time()
+        for entity_id, detail in entries:
+            row = {
+                "action": action,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "actor": actor.actor if actor else None,
+                "ip": actor.ip if actor else None,
+                "detail": detail,
+                "created_at": now,
+            }
+            try:
+                self._queue.put_nowait(row)
+            except asyncio.QueueFull:
+                try:
+                    await asyncio.wait_for(self._queue.put(row), self.put_timeout)
+                except asyncio.TimeoutError:
+                    AUDIT_EVENTS.inc(result="dropped")
+                    logger.warning("Hàng đợi audit đầy, bỏ sự kiện %s %s:%s", action, entity_type, entity_id)
+        AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def _next_batch(self, queue: asyncio.Queue) -> list:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _insert(self, rows: list):
+        with self.bind.begin() as conn:
+            conn.execute(insert(AuditLog).values(rows))
+
+    async def _flush(self, queue: asyncio.Queue, batch: list):
+        # Nhận hàng đợi qua tham số: ``stop`` có thể đã đặt ``self._queue = None`` khi lô này còn đang ghi
+        try:
+            await run_in_threadpool(self._insert, batch)
+            AUDIT_EVENTS.inc(len(batch), result="written")
+        except Exception:
+            AUDIT_EVENTS.inc(len(batch), result="failed")
+            logger.error("Không ghi được %d sự kiện audit", len(batch), exc_info=True)
+        finally:
+            for _ in batch:
+                queue.task_done()
+            AUDIT_QUEUE_DEPTH.set(queue.qsize())
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = await self._next_batch(queue)
+            # Không để huỷ task làm mất lô đang ghi; ``stop`` chờ lô này xong
+            self._flushing = asyncio.ensure_future(self._flush(queue, batch))
+            await asyncio.shield(self._flushing)
+
+    async def stop(self, timeout: float = settings.audit_drain_timeout):
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Hết thời gian chờ ghi audit, bỏ %d sự kiện", self._queue.qsize())
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        self._flushing = None
+        self._worker = None
+        self._queue = None
+
+
+audit_log = AuditLogger(
+    engine,
+    max_queue=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_ms / 1000,
+    put_timeout=settings.audit_put_timeout,
+    enabled=settings.audit_enabled,
+)
+
+
+def bulk_entries(results, status: str, items=None) -> list:
+    # Các cặp (entity_id, detail) cho record_many từ kết quả của app.core.bulk
+    return [
+        (r.id, items[r.index].model_dump() if items is not None else None)
+        for r in results if r.status == status
+    ]
@@ -0,0 +1,314 @@
+import base64
+import logging
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db_session import DBSession
+from app.core.helpers import APIException, get_current_user, get_token_payload
+from app.core.catalog_cache import catalog_cache
+from app.core.etag import PERMISSIONS
+from app.core.metrics import record_cache
+from app.core.redis_cache import RedisCache, redis_cache
+from app.enums.status_code import ResponseCode
+from app.models.permission import Permission
+from app.models.role import Role, role_closure, role_permissions
+from app.models.user import User, user_roles
+
+logger = logging.getLogger(__name__)
+
+
+class PermissionResolver:
+    """Tính và cache tập permission id hiệu lực của từng user.
+
+    Tập quyền được dựng một lần bằng một truy vấn join ``user_roles``,
+    ``role_closure`` (role của user và mọi role cha) và ``role_permissions``, lưu
+    dạng ``frozenset`` trong process (TTL ngắn) và trong Redis (TTL dài). Khi
+    gán/huỷ quyền của role, đổi cây kế thừa hoặc đổi role của user, chỉ các user
+    bị ảnh hưởng bị xoá khỏi cache và được dựng lại ở lần truy cập sau.
+
+    Mỗi bản cache (cả hai tầng) gắn ``authz_version`` của user lúc nạp; mỗi lần tra
+    đọc version hiện tại (một GET) và bỏ bản cache cũ hơn, nên thu hồi quyền ở
+    worker này có hiệu lực ngay ở mọi worker thay vì chờ hết TTL của tầng local.
+    """
+
+    def __init__(self, cache: RedisCache, ttl: int, local_ttl: float, max_entries: int = 100_000, prefix: str = "authz:perms:", version_prefix: str = "authz:ver:"):
+        self.cache = cache
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.version_prefix = version_prefix
+        self._user_permissions = OrderedDict()
+        self._permission_ids = {}
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    @staticmethod
+    def encode(permission_ids: Iterable[int]) -> str:
+        return ",".join(str(i) for i in sorted(permission_ids))
+
+    @staticmethod
+    def decode(raw: str) -> frozenset:
+        return frozenset(int(i) for i in raw.split(",") if i)
+
+    async def _get_redis(self, user_id: int, version: Optional[int]) -> Optional[frozenset]:
+        # Giá trị dạng "<authz_version>|<id,id,...>"; bản ghi của version khác coi như miss
+        try:
+            redis = await self.cache.get_redis()
+            raw = await redis.get(self._key(user_id))
+        except Exception:
+            logger.warning("Không đọc được cache phân quyền", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        stored, _, ids = raw.partition("|")
+        if version is not None and stored != str(version):
+            return None
+        return self.decode(ids)
+
+    async def _set_redis(self, user_id: int, permission_ids: frozenset, version: Optional[int]):
+        if version is None:
+            # Không đọc được version thì cũng không ghi được Redis
+            return
+        try:
+            redis = await self.cache.get_redis()
+            await redis.set(self._key(user_id), f"{version}|{self.encode(permission_ids)}", ex=self.ttl)
+        except Exception:
+            logger.warning("Không ghi được cache phân quyền", exc_info=True)
+
+    async def build(self, db: AsyncSession, user_id: int) -> frozenset:
+        # Join Role/Permission để bộ lọc xoá mềm loại các role, permission đã xoá (liên kết còn giữ tới khi purge)
+        result = await db.scalars(
+            select(role_permissions.c.permission_id)
+            .join(role_closure, role_closure.c.ancestor_id == role_permissions.c.role_id)
+            .join(user_roles, user_roles.c.role_id == role_closure.c.descendant_id)
+            .join(Role, Role.id == role_permissions.c.role_id)
+            .join(Permission, Permission.id == role_permissions.c.permission_id)
+            .where(user_roles.c.user_id == user_id)
+            .distinct()
+        )
+        return frozenset(result.all())
+
+    async def permission_ids(self, db: AsyncSession, user_id: int) -> frozenset:
+        # Đọc version trước khi nạp: thu hồi xảy ra giữa chừng làm bản vừa nạp cũ ngay ở lần tra sau.
+        # Redis lỗi (version None) thì tầng local chỉ còn giới hạn bởi TTL như trước
+        version = await self.authz_version(user_id)
+        now = time.monotonic()
+        cached = self._user_permissions.get(user_id)
+        if cached is not None and cached[0] > now and (version is None or cached[1] == version):
+            record_cache("authz_local", True)
+            self._user_permissions.move_to_end(user_id)
+            return cached[2]
+        record_cache("authz_local", False)
+        permission_ids = await self._get_redis(user_id, version)
+        record_cache("authz_redis", permission_ids is not None)
+        if permission_ids is None:
+            permission_ids = await self.build(db, user_id)
+            await self._set_redis(user_id, permission_ids, version)
+        self._user_permissions[user_id] = (now + self.local_ttl, version, permission_ids)
+        self._user_permissions.move_to_end(user_id)
+        if len(self._user_permissions) > self.max_entries:
+            self._user_permissions.popitem(last=False)
+        return permission_ids
+
+    async def permission_id(self, db: AsyncSession, name: str) -> Optional[int]:
+        now = time.monotonic()
+        cached = self._permission_ids.get(name)
+        record_cache("authz_permission_name", cached is not None and cached[0] > now)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        permission_id = await db.scalar(select(Permission.id).where(Permission.name == name))
+        # Không cache tên chưa tồn tại, để permission vừa tạo có hiệu lực ngay
+        if permission_id is not None:
+            self._permission_ids[name] = (now + self.local_ttl, permission_id)
+        return permission_id
+
+    async def has_permissions(self, db: AsyncSession, user_id: int, names: Iterable[str]) -> bool:
+        granted = await self.permission_ids(db, user_id)
+        for name in names:
+            permission_id = await self.permission_id(db, name)
+            if permission_id is None or permission_id not in granted:
+                return False
+        return True
+
+    async def authz_version(self, user_id: int) -> Optional[int]:
+        # Bộ đếm authz_version của user; None nếu không đọc được Redis
+        try:
+            redis = await self.cache.get_redis()
+            raw = await redis.get(f"{self.version_prefix}{user_id}")
+        except Exception:
+            logger.warning("Không đọc được authz_version", exc_info=True)
+            return None
+        return int(raw or 0)
+
+    async def invalidate_users(self, *user_ids: int):
+        for user_id in user_ids:
+            self._user_permissions.pop(user_id, None)
+        if not user_ids:
+            return
+        try:
+            redis = await self.cache.get_redis()
+            # Xoá cache và tăng authz_version để thu hồi các token đang mang quyền cũ
+            pipe = redis.pipeline(transaction=False)
+            pipe.delete(*(self._key(u) for u in user_ids))
+            for user_id in user_ids:
+                pipe.incr(f"{self.version_prefix}{user_id}")
+            await pipe.execute()
+        except Exception:
+            logger.warning("Không xoá được cache phân quyền", exc_info=True)
+
+    async def users_of_roles(self, db: AsyncSession, *role_ids: int) -> list:
+        if not role_ids:
+            return []
+        # Gồm cả user có role kế thừa (trực tiếp hoặc gián tiếp) từ các role này
+        user_ids = await db.scalars(
+            select(user_roles.c.user_id)
+            .join(role_closure, role_closure.c.descendant_id == user_roles.c.role_id)
+            .where(role_closure.c.ancestor_id.in_(role_ids))
+            .distinct()
+        )
+        return user_ids.all()
+
+    async def invalidate_roles(self, db: AsyncSession, *role_ids: int):
+        # Chỉ dựng lại quyền của các user đang có role bị thay đổi
+        await self.invalidate_users(*await self.users_of_roles(db, *role_ids))
+
+    def invalidate_permission_names(self):
+        self._permission_ids.clear()
+
+
+permission_resolver = PermissionResolver(
+    redis_cache,
+    ttl=settings.authz_cache_ttl,
+    local_ttl=settings.authz_local_ttl,
+    max_entries=settings.authz_local_max_entries,
+)
+# Đổi tên/xoá permission ở bất kỳ worker nào cũng xoá ánh xạ tên -> id ở mọi worker (qua pub/sub của catalog cache)
+catalog_cache.on_invalidate(PERMISSIONS, permission_resolver.invalidate_permission_names)
+
+
+def encode_permission_set(permission_ids: Iterable[int]) -> str:
+    # Bitset theo permission id, nén zlib rồi base64url để nhúng vào JWT
+    permission_ids = list(permission_ids)
+    if not permission_ids:
+        return ""
+    bits = bytearray((max(permission_ids) >> 3) + 1)
+    for i in permission_ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return base64.urlsafe_b64encode(zlib.compress(bytes(bits), 9)).rstrip(b"=").decode()
+
+
+def decode_permission_set(value: str) -> frozenset:
+    if not value:
+        return frozenset()
+    bits = zlib.decompress(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    return frozenset(
+        (index << 3) | bit
+        for index, byte in enumerate(bits) if byte
+        for bit in range(8) if byte >> bit & 1
+    )
+
+
+async def build_authz_claims(db: AsyncSession, user_id: int) -> dict:
+    # Đọc version trước khi tính quyền để thay đổi xảy ra giữa chừng vẫn làm token mất hiệu lực
+    version = await permission_resolver.authz_version(user_id)
+    if version is None:
+        return {}
+    role_ids = await db.scalars(
+        select(user_roles.c.role_id).join(Role, Role.id == user_roles.c.role_id).where(user_roles.c.user_id == user_id)
+    )
+    # Tính thẳng từ DB: cache (nhất là tầng local của worker khác) có thể còn quyền đã thu hồi trước khi đọc version,
+    # khi đó token mang "av" mới nhưng "perms" cũ. Chỉ chạy lúc đăng nhập/refresh nên chi phí chấp nhận được
+    permission_ids = await permission_resolver.build(db, user_id)
+    return {
+        "uid": user_id,
+        "rids": sorted(role_ids.all()),
+        "perms": encode_permission_set(permission_ids),
+        "av": version,
+    }
+
+
+async def check_permissions_batch(db: AsyncSession, checks: Sequence[Tuple[int, Sequence[str], bool]]) -> List[bool]:
+    """Kiểm tra hàng loạt ``(user_id, tên permission, cần đủ tất cả)``, luôn tối đa ba truy vấn.
+
+    Lần lượt: đổi tên sang id, lấy role trực tiếp của các user được hỏi, rồi lấy các
+    cặp (role, permission) hiệu lực qua ``role_closure`` cho đúng các role và
+    permission đó. Số dòng đọc tỉ lệ với số role khác nhau chứ không với số user;
+    phần còn lại là phép tra tập hợp trong bộ nhớ.
+    """
+    names = {name for _, permission_names, _ in checks for name in permission_names}
+    permission_ids = dict((await db.execute(
+        select(Permission.name, Permission.id).where(Permission.name.in_(names))
+    )).all()) if names else {}
+    roles_of = defaultdict(set)
+    granted = set()
+    if permission_ids:
+        # Join User để bỏ user đã xoá mềm, join Role của role cấp quyền để bỏ role đã xoá mềm
+        for user_id, role_id in (await db.execute(
+            select(user_roles.c.user_id, user_roles.c.role_id)
+            .join(User, User.id == user_roles.c.user_id)
+            .where(user_roles.c.user_id.in_({user_id for user_id, _, _ in checks}))
+        )).all():
+            roles_of[user_id].add(role_id)
+    role_ids = set().union(*roles_of.values())
+    if role_ids:
+        granted = set((await db.execute(
+            select(role_closure.c.descendant_id, role_permissions.c.permission_id)
+            .join(role_permissions, role_permissions.c.role_id == role_closure.c.ancestor_id)
+            .join(Role, Role.id == role_permissions.c.role_id)
+            .where(role_closure.c.descendant_id.in_(role_ids), role_permissions.c.permission_id.in_(set(permission_ids.values())))
+            .distinct()
+        )).all())
+    results = []
+    for user_id, permission_names, require_all in checks:
+        roles = roles_of.get(user_id, ())
+        hits = [
+            any((role_id, permission_ids.get(name)) in granted for role_id in roles)
+            for name in permission_names
+        ]
+        results.append(bool(hits) and (all(hits) if require_all else any(hits)))
+    return results
+
+
+async def token_permissions(payload: dict) -> Optional[frozenset]:
+    # Tập quyền nhúng trong token nếu còn hiệu lực; None nếu token không mang quyền hoặc Redis lỗi
+    if "perms" not in payload or "uid" not in payload:
+        return None
+    version = await permission_resolver.authz_version(payload["uid"])
+    if version is None:
+        return None
+    if version != payload.get("av"):
+        raise APIException(
+            code=ResponseCode.TOKEN_EXPIRED,
+            message="Quyền đã thay đổi, vui lòng đăng nhập lại"
+        )
+    return decode_permission_set(payload["perms"])
+
+
+def require_permission(*names: str):
+    # Dùng: dependencies=[Depends(require_permission("role.update"))], trả về id của user
+    async def dependency(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(DBSession.async_dependency)):
+        granted = await token_permissions(payload)
+        if granted is not None:
+            user_id = payload["uid"]
+            permission_ids = [await permission_resolver.permission_id(db, name) for name in names]
+            allowed = all(p is not None and p in granted for p in permission_ids)
+        else:
+            current_user = await get_current_user(payload, db)
+            user_id = current_user.data.id
+            allowed = await permission_resolver.has_permissions(db, user_id, names)
+        if not allowed:
+            raise APIException(
+                code=ResponseCode.PERMISSION_DENIED,
+                message="Không có quyền thực hiện thao tác này"
+            )
+        return user_id
+    return dependency
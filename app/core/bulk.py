@@ -0,0 +1,85 @@
+from typing import List, Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.helpers import APIException
+from app.core.config import settings
+from app.enums.status_code import ResponseCode
+from app.schemas.bulk import BulkItemResult
+from app.utils.time import get_vietnam_time
+
+# Các hàm dùng chung cho API bulk của permission và role (model có cột id, name, description).
+# Mỗi hàm chỉ dùng một số truy vấn cố định bất kể số phần tử; caller tự commit.
+
+
+def check_bulk_size(items: Sequence):
+    if len(items) > settings.bulk_max_items:
+        raise APIException(
+            code=ResponseCode.VALIDATION_ERROR,
+            message=f"Tối đa {settings.bulk_max_items} phần tử mỗi lần"
+        )
+
+
+async def bulk_create(db: AsyncSession, model, items) -> List[BulkItemResult]:
+    check_bulk_size(items)
+    names = {item.name for item in items}
+    # name vẫn unique với cả bản ghi đã xoá mềm
+    existing = set((await db.scalars(
+        select(model.name).where(model.name.in_(names)).execution_options(include_deleted=True)
+    )).all()) if names else set()
+    results, rows = [], []
+    for index, item in enumerate(items):
+        if item.name in existing:
+            results.append(BulkItemResult(index=index, status="conflict", message=f"'{item.name}' đã tồn tại"))
+            continue
+        existing.add(item.name)
+        rows.append({"name": item.name, "description": item.description})
+        results.append(BulkItemResult(index=index, status="created"))
+    if rows:
+        # Một câu INSERT nhiều dòng, sau đó lấy lại id theo name (MySQL không hỗ trợ RETURNING)
+        await db.execute(insert(model).values(rows))
+        created_names = [r["name"] for r in rows]
+        ids = dict((await db.execute(select(model.name, model.id).where(model.name.in_(created_names)))).all())
+        for index, item in enumerate(items):
+            if results[index].status == "created":
+                results[index].id = ids.get(item.name)
+    return results
+
+
+async def bulk_update(db: AsyncSession, model, items) -> List[BulkItemResult]:
+    check_bulk_size(items)
+    ids = {item.id for item in items}
+    found = set((await db.scalars(select(model.id).where(model.id.in_(ids)))).all()) if ids else set()
+    names = {item.name for item in items}
+    # name -> id của các bản ghi đang giữ name đó, để phát hiện trùng với bản ghi khác
+    owners = dict((await db.execute(
+        select(model.name, model.id).where(model.name.in_(names)).execution_options(include_deleted=True)
+    )).all()) if names else {}
+    results, rows = [], []
+    for index, item in enumerate(items):
+        if item.id not in found:
+            results.append(BulkItemResult(index=index, id=item.id, status="not_found", message="Không tồn tại"))
+            continue
+        owner = owners.get(item.name)
+        if owner is not None and owner != item.id:
+            results.append(BulkItemResult(index=index, id=item.id, status="conflict", message=f"'{item.name}' đã tồn tại"))
+            continue
+        owners[item.name] = item.id
+        rows.append({"id": item.id, "name": item.name, "description": item.description})
+        results.append(BulkItemResult(index=index, id=item.id, status="updated"))
+    if rows:
+        await db.execute(update(model), rows)
+    return results
+
+
+async def bulk_delete(db: AsyncSession, model, ids: Sequence[int]) -> List[BulkItemResult]:
+    check_bulk_size(ids)
+    found = set((await db.scalars(select(model.id).where(model.id.in_(ids)))).all()) if ids else set()
+    if found:
+        # Xoá mềm; các dòng liên kết được giữ tới khi purge (app.db.purge) xoá hẳn bản ghi
+        await db.execute(update(model).where(model.id.in_(found)).values(deleted_at=get_vietnam_time()))
+    return [
+        BulkItemResult(index=index, id=i, status="deleted" if i in found else "not_found")
+        for index, i in enumerate(ids)
+    ]
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.etag import PERMISSIONS, ROLES, ROLE_PERMISSIONS, ChangeVersions, change_versions
+from app.core.metrics import record_cache
+from app.core.redis_cache import RedisCache, redis_cache
+
+logger = logging.getLogger(__name__)
+
+NAMESPACES = (PERMISSIONS, ROLES, ROLE_PERMISSIONS)
+
+# Chỉ ghi nếu version của namespace chưa đổi kể từ lúc đọc, để kết quả nạp từ DB trước một lần ghi
+# không đè lên cache đã bị xoá. TTL đặt một lần khi hash được tạo, không gia hạn theo lượt đọc.
+# KEYS[1] = hash của namespace, KEYS[2] = version; ARGV = version đã đọc, field, value, TTL
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+
+class CatalogCache:
+    """Cache hai tầng (trong process + Redis) cho danh mục role/permission.
+
+    Mỗi namespace (``permissions``, ``roles``, ``role_permissions``) là một hash
+    ``<prefix><namespace>`` trong Redis cộng một LRU/TTL ngắn trong từng process.
+    Các API ghi gọi ``invalidate`` sau commit: tăng version dùng cho ETag, xoá hash
+    và publish tên namespace để mọi worker đang ``listen`` xoá tầng local ngay.
+    Mỗi entry local gắn version của namespace lúc nạp; ``get`` bỏ entry cũ hơn
+    version hiện tại nên không phụ thuộc vào việc listener đã nhận tin hay chưa.
+    Các lượt miss đồng thời cho cùng một key chỉ chạy loader một lần.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        versions: ChangeVersions,
+        local_ttl: float,
+        local_max_entries: int,
+        redis_ttl: int,
+        enabled: bool = True,
+        prefix: str = "catalog:",
+        channel: str = "catalog:invalidate",
+    ):
+        self.cache = cache
+        self.versions = versions
+        self.local_ttl = local_ttl
+        self.local_max_entries = local_max_entries
+        self.redis_ttl = redis_ttl
+        self.enabled = enabled
+        self.prefix = prefix
+        self.channel = channel
+        self._local = {ns: OrderedDict() for ns in NAMESPACES}
+        self._generation = dict.fromkeys(NAMESPACES, 0)
+        self._inflight = {}
+        self._fill = None
+        self._listener = None
+        self._stopping = False
+        self._callbacks = {ns: [] for ns in NAMESPACES}
+
+    def _hash_key(self, namespace: str) -> str:
+        return f"{self.prefix}{namespace}"
+
+    def _get_local(self, namespace: str, key: str, version: Optional[int]):
+        # version None (không đọc được Redis) thì chỉ còn dựa vào TTL và pub/sub
+        entries = self._local[namespace]
+        cached = entries.get(key)
+        if cached is None or cached[0] <= time.monotonic():
+            return False, None
+        if version is not None and (cached[1] is None or cached[1] < version):
+            return False, None
+        entries.move_to_end(key)
+        return True, cached[2]
+
+    def _set_local(self, namespace: str, key: str, value, generation: int, version: Optional[int]):
+        # Bỏ qua nếu namespace đã bị invalidate trong lúc nạp
+        if self._generation[namespace] != generation:
+            return
+        entries = self._local[namespace]
+        entries[key] = (time.monotonic() + self.local_ttl, version, value)
+        entries.move_to_end(key)
+        if len(entries) > self.local_max_entries:
+            entries.popitem(last=False)
+
+    def on_invalidate(self, namespace: str, callback: Callable[[], None]):
+        # Cache khác dựa trên dữ liệu của namespace (vd. ánh xạ tên permission -> id) được xoá cùng tầng local
+        self._callbacks[namespace].append(callback)
+
+    def clear_local(self, *namespaces: str):
+        for namespace in namespaces or NAMESPACES:
+            if namespace in self._local:
+                self._local[namespace] = OrderedDict()
+                self._generation[namespace] += 1
+                for callback in self._callbacks[namespace]:
+                    callback()
+
+    async def _get_redis(self, namespace: str, key: str):
+        # Một round trip: giá trị và version hiện tại của namespace
+        try:
+            redis = await self.cache.get_redis()
+            pipe = redis.pipeline(transaction=False)
+            pipe.hget(self._hash_key(namespace), key)
+            pipe.get(self.versions.key(namespace))
+            raw, version = await pipe.execute()
+        except Exception:
+            logger.warning("Không đọc được catalog cache", exc_info=True)
+            return False, None, None
+        version = version or "0"
+        if raw is None:
+            return False, None, version
+        return True, orjson.loads(raw), version
+
+    async def _set_redis(self, namespace: str, key: str, value, version: str):
+        try:
+            redis = await self.cache.get_redis()
+            if self._fill is None or self._fill.registered_client is not redis:
+                self._fill = redis.register_script(FILL_SCRIPT)
+            await self._fill(
+                keys=[self._hash_key(namespace), self.versions.key(namespace)],
+                args=[version, key, orjson.dumps(value), self.redis_ttl],
+            )
+        except Exception:
+            logger.warning("Không ghi được catalog cache", exc_info=True)
+
+    async def _load(self, namespace: str, key: str, loader, cache_none: bool):
+        generation = self._generation[namespace]
+        found, value, version = await self._get_redis(namespace, key)
+        record_cache("catalog_redis", found)
+        if not found:
+            value = await loader()
+            if version is not None and (value is not None or cache_none):
+                await self._set_redis(namespace, key, value, version)
+        if value is not None or cache_none:
+            self._set_local(namespace, key, value, generation, None if version is None else int(version))
+        return value
+
+    async def get(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]], cache_none: bool = True, version: Optional[int] = None) -> Any:
+        """Trả về giá trị JSON-serializable của ``key``, gọi ``loader`` khi cả hai tầng đều miss.
+
+        ``version`` là version của namespace mà caller đã đọc (vd. để dựng ETag); không
+        truyền thì tự đọc. Entry local nạp dưới version cũ hơn bị bỏ qua, nên body
+        không bao giờ cũ hơn ETag. Giá trị trả về dùng chung giữa các request, chỉ được đọc.
+        """
+        if not self.enabled:
+            return await loader()
+        if version is None:
+            versions = await self.versions.get(namespace)
+            version = versions[0] if versions is not None else None
+        found, value = self._get_local(namespace, key, version)
+        record_cache("catalog_local", found)
+        if found:
+            return value
+        # Theo version để request đã thấy version mới không chờ lượt nạp bắt đầu dưới version cũ
+        inflight_key = (namespace, key, version)
+        future = self._inflight.get(inflight_key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Request đang nạp bị huỷ: tự nạp lại
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            value = await self._load(namespace, key, loader, cache_none)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # đánh dấu đã đọc để không bị log "never retrieved" khi không có ai chờ
+            raise
+        finally:
+            if self._inflight.get(inflight_key) is future:
+                del self._inflight[inflight_key]
+        future.set_result(value)
+        return value
+
+    async def invalidate(self, *namespaces: str):
+        # Gọi sau commit; đồng thời tăng version dùng cho ETag (xem app.core.etag) và báo cho các worker khác
+        self.clear_local(*namespaces)
+        try:
+            redis = await self.cache.get_redis()
+            # MULTI: worker khác không được thấy version mới cùng hash cũ (rồi gắn version mới cho dữ liệu cũ)
+            pipe = redis.pipeline(transaction=True)
+            for namespace in namespaces:
+                pipe.incr(self.versions.key(namespace))
+            pipe.delete(*(self._hash_key(ns) for ns in namespaces))
+            pipe.publish(self.channel, ",".join(namespaces))
+            await pipe.execute()
+        except Exception:
+            # ETag và cache Redis cũ có thể còn được dùng tới lần ghi kế tiếp hoặc khi hết TTL
+            logger.error("Không invalidate được catalog %s", namespaces, exc_info=True)
+
+    async def listen(self):
+        # Nhận thông báo invalidate từ các worker khác; mất kết nối thì xoá toàn bộ tầng local vì có thể đã lỡ tin
+        while not self._stopping:
+            pubsub = None
+            try:
+                redis = await self.cache.get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                self.clear_local()
+                while not self._stopping:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.clear_local(*message["data"].split(","))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Mất kết nối pub/sub của catalog cache, thử lại sau 1s", exc_info=True)
+                self.clear_local()
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def start(self):
+        # Vẫn lắng nghe khi tắt cache để các callback on_invalidate nhận thông báo từ worker khác
+        if self._listener is None:
+            self._stopping = False
+            self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            # Client Redis có thể nuốt CancelledError khi đang subscribe; cờ này đảm bảo vòng lặp vẫn thoát
+            self._stopping = True
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+catalog_cache = CatalogCache(
+    redis_cache,
+    change_versions,
+    local_ttl=settings.catalog_local_ttl,
+    local_max_entries=settings.catalog_local_max_entries,
+    redis_ttl=settings.catalog_redis_ttl,
+    enabled=settings.catalog_cache_enabled,
+)
+
@@ -8,7 +8,92 @@ class Settings(BaseSettings):
     app_name: str = "FastAPI App"
     debug: bool = True
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    # Bật chế độ AsyncEngine/AsyncSession cho các router (mặc định dùng Session đồng bộ chạy trong threadpool)
+    db_async: bool = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    # Để trống sẽ tự suy ra từ DATABASE_URL (mysql -> mysql+aiomysql, sqlite -> sqlite+aiosqlite)
+    async_database_url: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Cấu hình connection pool (áp dụng cho cả engine đồng bộ và async)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Nên nhỏ hơn wait_timeout của MySQL để tránh "MySQL server has gone away"
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Read replica (phân tách bởi dấu phẩy): request GET/HEAD/OPTIONS đọc từ replica, còn lại dùng primary
+    replica_database_urls: str = os.getenv("REPLICA_DATABASE_URLS", "")
+    # Để trống sẽ tự suy ra từ REPLICA_DATABASE_URLS như ASYNC_DATABASE_URL
+    async_replica_database_urls: str = os.getenv("ASYNC_REPLICA_DATABASE_URLS", "")
+    # Sau một request ghi, các lần đọc của cùng client đi primary trong khoảng thời gian này (giây)
+    db_sticky_primary_seconds: float = float(os.getenv("DB_STICKY_PRIMARY_SECONDS", "5"))
+    db_sticky_cookie: str = os.getenv("DB_STICKY_COOKIE", "db_primary_until")
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    redis_timeout: float = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+    # Thời gian sống (giây) của thông tin user đã xác thực trong Redis
+    principal_cache_ttl: int = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+    # Pool chạy bcrypt: "thread" hoặc "process"
+    password_pool_kind: str = os.getenv("PASSWORD_POOL_KIND", "thread")
+    password_pool_workers: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(os.cpu_count() or 1, 4))))
+    # Vượt quá số tác vụ đang chạy/chờ này thì trả về SERVICE_BUSY ngay
+    password_pool_max_in_flight: int = int(os.getenv("PASSWORD_POOL_MAX_IN_FLIGHT", "32"))
+    # SERVICE_BUSY trả HTTP 503 kèm Retry-After (giây) nếu nơi raise không tự đặt
+    service_busy_retry_after: int = int(os.getenv("SERVICE_BUSY_RETRY_AFTER", "1"))
+    # Cache tập permission hiệu lực của user: TTL trong Redis và trong từng process
+    authz_cache_ttl: int = int(os.getenv("AUTHZ_CACHE_TTL", "600"))
+    authz_local_ttl: float = float(os.getenv("AUTHZ_LOCAL_TTL", "30"))
+    authz_local_max_entries: int = int(os.getenv("AUTHZ_LOCAL_MAX_ENTRIES", "100000"))
+    # Phân trang keyset cho các API danh sách
+    page_size_default: int = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+    page_size_max: int = int(os.getenv("PAGE_SIZE_MAX", "500"))
+    # Số dòng đọc mỗi lô khi stream dữ liệu export
+    export_chunk_size: int = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    # Số phần tử tối đa cho mỗi request bulk
+    bulk_max_items: int = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+    # Số phần tử tối đa của một lần gọi POST /authz/check
+    authz_check_max_items: int = int(os.getenv("AUTHZ_CHECK_MAX_ITEMS", "10000"))
+    # Đo thời gian/SQL theo từng request và xuất ở /metrics
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    # "basic": token chỉ có sub; "authz": nhúng uid, role id, tập permission và authz_version
+    token_mode: str = os.getenv("TOKEN_MODE", "basic")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "anph13local")
+    # HS256 (dùng SECRET_KEY), RS256 hoặc ES256 (dùng cặp khoá, công bố ở /.well-known/jwks.json)
+    jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
+    # Đường dẫn file PEM, phân tách bởi dấu phẩy; khoá private đầu tiên dùng để ký
+    jwt_private_keys: str = os.getenv("JWT_PRIVATE_KEYS", "")
+    # Khoá public của các khoá đã xoay vòng, vẫn được chấp nhận khi xác thực
+    jwt_public_keys: str = os.getenv("JWT_PUBLIC_KEYS", "")
+    jwks_max_age: int = int(os.getenv("JWKS_MAX_AGE", "3600"))
+    # Refresh token: TTL nhàn rỗi (gia hạn mỗi lần xoay vòng) và thời gian sống tối đa của một phiên (giây)
+    refresh_token_ttl: int = int(os.getenv("REFRESH_TOKEN_TTL", str(14 * 24 * 3600)))
+    refresh_token_max_lifetime: int = int(os.getenv("REFRESH_TOKEN_MAX_LIFETIME", str(30 * 24 * 3600)))
+    # Giới hạn tần suất "<số request>/<số giây>" cho đăng nhập/đăng ký, áp dụng trước khi truy vấn DB hay hash mật khẩu
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    rate_limit_login_ip: str = os.getenv("RATE_LIMIT_LOGIN_IP", "30/60")
+    rate_limit_login_username: str = os.getenv("RATE_LIMIT_LOGIN_USERNAME", "5/60")
+    rate_limit_register_ip: str = os.getenv("RATE_LIMIT_REGISTER_IP", "10/3600")
+    # Chỉ bật khi app chạy sau reverse proxy tin cậy, lấy IP client từ X-Forwarded-For
+    rate_limit_trust_forwarded_for: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+    # Cache danh mục role/permission: tầng trong process (TTL ngắn, giới hạn theo namespace) và tầng Redis
+    catalog_cache_enabled: bool = os.getenv("CATALOG_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    catalog_local_ttl: float = float(os.getenv("CATALOG_LOCAL_TTL", "5"))
+    catalog_local_max_entries: int = int(os.getenv("CATALOG_LOCAL_MAX_ENTRIES", "10000"))
+    catalog_redis_ttl: int = int(os.getenv("CATALOG_REDIS_TTL", "300"))
+    # Bản ghi xoá mềm được giữ SOFT_DELETE_RETENTION_DAYS ngày rồi mới bị purge; PURGE_INTERVAL_SECONDS=0 để tắt job nền
+    soft_delete_retention_days: int = int(os.getenv("SOFT_DELETE_RETENTION_DAYS", "30"))
+    purge_interval_seconds: float = float(os.getenv("PURGE_INTERVAL_SECONDS", "3600"))
+    purge_batch_size: int = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+    # Audit log ghi nền theo lô: mỗi AUDIT_BATCH_SIZE sự kiện hoặc AUDIT_FLUSH_MS ms; hàng đợi đầy thì chờ tối đa
+    # AUDIT_PUT_TIMEOUT giây rồi bỏ sự kiện; khi tắt app chờ ghi hết tối đa AUDIT_DRAIN_TIMEOUT giây
+    audit_enabled: bool = os.getenv("AUDIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    audit_queue_size: int = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    audit_flush_ms: float = float(os.getenv("AUDIT_FLUSH_MS", "200"))
+    audit_put_timeout: float = float(os.getenv("AUDIT_PUT_TIMEOUT", "1"))
+    audit_drain_timeout: float = float(os.getenv("AUDIT_DRAIN_TIMEOUT", "10"))
+    # Khoá Redis tuần tự hoá mọi thay đổi cây kế thừa role: giữ tối đa ROLE_HIERARCHY_LOCK_TTL giây,
+    # request chờ tối đa ROLE_HIERARCHY_LOCK_WAIT giây rồi trả SERVICE_BUSY
+    role_hierarchy_lock_ttl: float = float(os.getenv("ROLE_HIERARCHY_LOCK_TTL", "10"))
+    role_hierarchy_lock_wait: float = float(os.getenv("ROLE_HIERARCHY_LOCK_WAIT", "5"))
+    # Số access token đã xác thực giữ trong LRU của mỗi process (0 để tắt)
+    token_cache_max_entries: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
 
 settings = Settings()
@@ -1,4 +1,9 @@
-from app.db.database import SessionLocal
+from contextlib import aclosing
+
+import anyio
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from app.db.database import SessionLocal, AsyncSessionLocal, ReplicaSessionLocals, AsyncReplicaSessionLocals
+from app.db.routing import choose_session_factory
 
 class DBSession:
     def __init__(self):
@@ -19,3 +24,124 @@ class DBSession:
             yield db
         finally:
             db.close()
+
+    @staticmethod
+    async def async_dependency():
+        # DB_ASYNC=true: AsyncSession thật; ngược lại bọc Session đồng bộ để không chặn event loop.
+        # Request chỉ đọc dùng replica nếu có cấu hình (xem app.db.routing)
+        # aclosing: FastAPI chỉ đóng generator ngoài, generator bên trong phải được đóng theo để trả session
+        async with aclosing(_async_session(AsyncReplicaSessionLocals, ReplicaSessionLocals)) as sessions:
+            async for db in sessions:
+                yield db
+
+    @staticmethod
+    async def primary_async_dependency():
+        # Luôn đọc primary: dùng cho API có catalog cache/ETag, vì dữ liệu đọc từ replica trễ sẽ bị
+        # lưu vào cache và gắn ETag theo version hiện tại, rồi được coi là mới cho tới lần ghi sau
+        async with aclosing(_async_session([], [])) as sessions:
+            async for db in sessions:
+                yield db
+
+    @staticmethod
+    async def stream(statement, chunk_size: int = 1000):
+        # Đọc bằng server-side cursor theo từng lô (yield_per), tự mở session riêng
+        # vì StreamingResponse còn chạy sau khi dependency của request đã đóng.
+        # Client ngắt giữa chừng thì đóng cursor/session ngay thay vì chờ GC thu generator
+        statement = statement.execution_options(yield_per=chunk_size)
+        if AsyncSessionLocal is not None:
+            async with choose_session_factory(AsyncSessionLocal, AsyncReplicaSessionLocals)() as db:
+                result = await db.stream(statement)
+                try:
+                    async with aclosing(result.partitions()) as partitions:
+                        async for rows in partitions:
+                            yield rows
+                finally:
+                    with anyio.CancelScope(shield=True):
+                        await result.close()
+        else:
+            # Chọn session ngay trong request vì iterate_in_threadpool chạy ở thread khác
+            session_factory = choose_session_factory(SessionLocal, ReplicaSessionLocals)
+            partitions = _sync_partitions(statement, session_factory)
+            try:
+                async with aclosing(iterate_in_threadpool(partitions)) as chunks:
+                    async for rows in chunks:
+                        yield rows
+            finally:
+                # Shield vì task có thể đang bị huỷ (client ngắt); close() chạy khối with của
+                # generator nên session được trả về pool
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(partitions.close)
+
+
+async def _async_session(async_replicas, replicas):
+    if AsyncSessionLocal is not None:
+        async with choose_session_factory(AsyncSessionLocal, async_replicas)() as db:
+            yield db
+    else:
+        db = ThreadedSession(choose_session_factory(SessionLocal, replicas)(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+def _sync_partitions(statement, session_factory):
+    with session_factory() as db:
+        for rows in db.execute(statement).partitions():
+            yield rows
+
+
+class ThreadedSession:
+    """Cung cấp cùng API với AsyncSession nhưng chạy Session đồng bộ trong threadpool.
+
+    Dùng cho chế độ đồng bộ (mặc định, và khi test với SQLite) để các router chỉ
+    cần viết một lần theo kiểu ``await db.execute(...)``.
+    """
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def _execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # Đọc hết các dòng ngay trong thread để việc lấy kết quả không chặn event loop
+        if getattr(result, "returns_rows", True):
+            return result.freeze()()
+        return result
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalar()
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
@@ -0,0 +1,76 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.metrics import record_cache
+from app.core.redis_cache import RedisCache, redis_cache
+
+logger = logging.getLogger(__name__)
+
+PERMISSIONS = "permissions"
+ROLES = "roles"
+ROLE_PERMISSIONS = "role_permissions"
+
+
+class ChangeVersions:
+    """Bộ đếm thay đổi theo bảng trong Redis, dùng để dựng ETag cho các API đọc.
+
+    Các API ghi tăng bộ đếm qua ``catalog_cache.invalidate`` sau khi commit; API đọc
+    chỉ cần một lệnh MGET để biết dữ liệu đã đổi hay chưa, không phải truy vấn DB.
+    Redis lỗi thì API đọc bỏ qua ETag và trả dữ liệu như bình thường.
+    """
+
+    def __init__(self, cache: RedisCache, prefix: str = "ver:"):
+        self.cache = cache
+        self.prefix = prefix
+
+    def key(self, table: str) -> str:
+        return f"{self.prefix}{table}"
+
+    async def get(self, *tables: str) -> Optional[List[int]]:
+        try:
+            redis = await self.cache.get_redis()
+            values = await redis.mget([self.key(t) for t in tables])
+        except Exception:
+            logger.warning("Không đọc được version của bảng", exc_info=True)
+            return None
+        return [int(v or 0) for v in values]
+
+
+change_versions = ChangeVersions(redis_cache)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # So sánh yếu theo RFC 9110: bỏ tiền tố W/, chấp nhận danh sách và "*"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def check_etag(request: Request, response: Response, *tables: str) -> Tuple[Optional[Response], Dict[str, int]]:
+    """Đặt ETag theo version của các bảng; trả về response 304 nếu ``If-None-Match`` khớp,
+    kèm version đã đọc của từng bảng (rỗng nếu Redis lỗi).
+
+    Phải gọi trước khi truy vấn DB: version được đọc trước dữ liệu và chỉ tăng sau
+    commit. Khi body lấy từ ``catalog_cache`` phải truyền version này vào ``get`` để
+    không dùng entry nạp dưới version cũ, nếu không ETag mới sẽ gắn với dữ liệu cũ.
+    """
+    versions = await change_versions.get(*tables)
+    if versions is None:
+        return None, {}
+    table_versions = dict(zip(tables, versions))
+    source = f"{request.url.path}?{request.url.query}|" + ".".join(map(str, versions))
+    etag = '"' + hashlib.sha1(source.encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    not_modified = bool(if_none_match) and _matches(if_none_match, etag)
+    if if_none_match:
+        record_cache("etag", not_modified)
+    if not_modified:
+        return Response(status_code=304, headers=headers), table_versions
+    response.headers.update(headers)
+    return None, table_versions
@@ -1,38 +1,49 @@
 from fastapi import Depends, HTTPException, status
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.core.config import settings
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db_session import DBSession
+from app.core.principal_cache import principal_cache
+from app.core.token_cache import token_cache
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Any, Optional
 from app.enums.status_code import ResponseCode
-from app.models.user import User
 from app.schemas.user import UserRead
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(SessionLocal)):
+def authenticate(token: str) -> dict:
+    # Điểm xác thực access token duy nhất; token đã verify được lấy lại từ token_cache
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        username = payload.get("sub")
-        if username is None:
-            raise APIException(
-                code=ResponseCode.UNAUTHORIZED,
-                message="Token không hợp lệ"
-            )
+        payload = token_cache.verify(token)
     except JWTError:
         raise APIException(
             code=ResponseCode.UNAUTHORIZED,
             message="Token không hợp lệ"
         )
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    if payload.get("sub") is None:
+        raise APIException(
+            code=ResponseCode.UNAUTHORIZED,
+            message="Token không hợp lệ"
+        )
+    return payload
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    return authenticate(token)
+
+async def get_current_user(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(DBSession.async_dependency)):
+    principal = await principal_cache.load(db, payload["sub"])
+    if principal is None:
         raise APIException(
             code=ResponseCode.UNAUTHORIZED,
             message="Tài khoản không tồn tại"
         )
-    return APIResponse(data=UserRead.model_validate(user))
+    if principal["deleted"]:
+        raise APIException(
+            code=ResponseCode.UNAUTHORIZED,
+            message="Tài khoản đã bị khóa hoặc không tồn tại"
+        )
+    return APIResponse(data=UserRead.model_validate(principal["user"]))
 
 class APIResponse(BaseModel):
     code: int = ResponseCode.SUCCESS
@@ -40,14 +51,12 @@ class APIResponse(BaseModel):
     data: Optional[Any] = None
 
 class APIException(HTTPException):
-    def __init__(self, code: int, message: str, data: Any = None, status_code: int = 400):
+    def __init__(self, code: int, message: str, data: Any = None, status_code: int = 400, headers: Optional[dict] = None):
+        # Dựng thẳng dict theo cấu trúc APIResponse, APIJSONResponse sẽ serialize một lần
         super().__init__(
             status_code=status_code,
-            detail=APIResponse(
-                code=code,
-                message=message,
-                data=data
-            ).model_dump()
+            detail={"code": code, "message": message, "data": data},
+            headers=headers
         )
 
     
\ No newline at end of file
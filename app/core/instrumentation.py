@@ -0,0 +1,95 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.metrics import Counter, Histogram
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Thời gian xử lý request theo route", ["method", "route", "status"], buckets=REQUEST_BUCKETS)
+HTTP_REQUEST_DB_STATEMENTS = Histogram("http_request_db_statements", "Số câu SQL thực thi trong một request", ["method", "route"], buckets=STATEMENT_BUCKETS)
+HTTP_REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Tổng thời gian chạy SQL trong một request", ["method", "route"], buckets=REQUEST_BUCKETS)
+DB_STATEMENTS = Counter("db_statements_total", "Tổng số câu SQL đã thực thi", ["engine"])
+DB_STATEMENT_SECONDS = Histogram("db_statement_duration_seconds", "Thời gian chạy từng câu SQL", ["engine"], buckets=REQUEST_BUCKETS)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# ContextVar được copy sang thread của run_in_threadpool nên ThreadedSession vẫn ghi vào đúng request
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def instrument_engine(engine, label: str):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _finish(conn):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_STATEMENTS.inc(engine=label)
+        DB_STATEMENT_SECONDS.observe(elapsed, engine=label)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish(conn)
+
+    # Câu lỗi không gọi after_cursor_execute; không pop ở đây thì danh sách trên connection
+    # (sống cùng pool) lớn dần và các câu sau bị tính thời gian theo mốc của câu lỗi
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if exception_context.execution_context is not None and conn is not None and conn.info.get("query_started"):
+            _finish(conn)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware đo thời gian, số câu SQL và thời gian DB của từng request theo route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            # Dùng path template của route (vd. /role/{role_id}) để tránh bùng nổ số label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status_code)
+            HTTP_REQUEST_DB_STATEMENTS.observe(stats.statements, method=method, route=route)
+            HTTP_REQUEST_DB_SECONDS.observe(stats.db_seconds, method=method, route=route)
@@ -0,0 +1,65 @@
+from typing import Literal, Optional
+
+from fastapi import Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.schemas.pagination import Page
+
+DeletedFilter = Literal["exclude", "include", "only"]
+
+
+class ListParams:
+    def __init__(
+        self,
+        limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+        cursor: Optional[int] = Query(None, description="id của phần tử cuối trang trước"),
+        name_prefix: Optional[str] = Query(None, max_length=50),
+        deleted: DeletedFilter = Query("exclude", description="exclude | include | only bản ghi đã xoá mềm"),
+        with_total: bool = Query(False, description="Trả thêm tổng số bản ghi khớp bộ lọc"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.name_prefix = name_prefix
+        self.deleted = deleted
+        self.with_total = with_total
+
+    def cache_key(self) -> str:
+        return f"list:{self.limit}:{self.cursor}:{self.name_prefix}:{self.deleted}:{self.with_total}"
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def apply_filters(stmt, model, params: ListParams):
+    if params.name_prefix:
+        stmt = stmt.where(model.name.like(escape_like(params.name_prefix) + "%", escape="\\"))
+    if params.deleted == "exclude":
+        stmt = stmt.where(model.deleted_at.is_(None))
+    elif params.deleted == "only":
+        stmt = stmt.where(model.deleted_at.is_not(None))
+    return stmt
+
+
+async def keyset_page(db: AsyncSession, model, read_schema, params: ListParams) -> Page:
+    # Keyset theo id: WHERE id > cursor ORDER BY id LIMIT n+1, chi phí không phụ thuộc độ sâu trang.
+    # Bộ lọc xoá mềm mặc định được tắt khi client yêu cầu include/only, apply_filters tự thêm điều kiện
+    include_deleted = params.deleted != "exclude"
+    stmt = apply_filters(select(model), model, params).execution_options(include_deleted=include_deleted)
+    if params.cursor is not None:
+        stmt = stmt.where(model.id > params.cursor)
+    rows = (await db.scalars(stmt.order_by(model.id).limit(params.limit + 1))).all()
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+    total = None
+    if params.with_total:
+        total = await db.scalar(
+            apply_filters(select(func.count()).select_from(model), model, params).execution_options(include_deleted=include_deleted)
+        )
+    return Page(
+        items=[read_schema.model_validate(r) for r in rows],
+        next_cursor=rows[-1].id if has_more else None,
+        total=total,
+    )
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.helpers import APIException
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.security import get_password_hash, verify_password
+from app.enums.status_code import ResponseCode
+
+PASSWORD_POOL_IN_FLIGHT = Gauge("password_pool_in_flight", "Số tác vụ bcrypt đang chạy hoặc chờ trong pool", ["pool"])
+PASSWORD_POOL_QUEUE_DEPTH = Gauge("password_pool_queue_depth", "Số tác vụ bcrypt đang chờ worker rảnh", ["pool"])
+PASSWORD_POOL_REJECTED = Counter("password_pool_rejected_total", "Số yêu cầu bị từ chối do pool đã đầy", ["pool", "op"])
+PASSWORD_HASH_SECONDS = Histogram("password_hash_seconds", "Thời gian chạy bcrypt trong worker", ["pool", "op"])
+PASSWORD_POOL_WAIT_SECONDS = Histogram("password_pool_wait_seconds", "Thời gian chờ trong hàng đợi trước khi chạy bcrypt", ["pool", "op"])
+
+
+def _timed_call(func, *args):
+    # Chạy trong worker (thread hoặc process) nên phải là hàm cấp module để pickle được
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started, time.perf_counter() - started
+
+
+class PasswordHasherPool:
+    """Chạy bcrypt ngoài event loop với giới hạn số tác vụ đồng thời.
+
+    Khi số tác vụ đang chạy/chờ đạt ``max_in_flight`` thì từ chối ngay với mã
+    ``SERVICE_BUSY`` thay vì xếp hàng vô hạn, để đợt đăng nhập dồn dập chỉ làm
+    chậm đăng nhập chứ không ảnh hưởng các endpoint khác.
+    """
+
+    def __init__(self, name: str = "default", kind: str = "thread", max_workers: int = 4, max_in_flight: int = 32):
+        if kind not in ("thread", "process"):
+            raise ValueError("kind phải là 'thread' hoặc 'process'")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight, max_workers)
+        self.in_flight = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            executor_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = executor_cls(max_workers=self.max_workers)
+        return self._executor
+
+    def _update_gauges(self):
+        PASSWORD_POOL_IN_FLIGHT.set(self.in_flight, pool=self.name)
+        PASSWORD_POOL_QUEUE_DEPTH.set(max(self.in_flight - self.max_workers, 0), pool=self.name)
+
+    async def run(self, op: str, func, *args):
+        if self.in_flight >= self.max_in_flight:
+            PASSWORD_POOL_REJECTED.inc(pool=self.name, op=op)
+            raise APIException(
+                code=ResponseCode.SERVICE_BUSY,
+                message="Hệ thống đang bận, vui lòng thử lại sau",
+                status_code=503
+            )
+        self.in_flight += 1
+        self._update_gauges()
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, elapsed = await loop.run_in_executor(self._get_executor(), _timed_call, func, *args)
+        finally:
+            self.in_flight -= 1
+            self._update_gauges()
+        # perf_counter của process con không cùng gốc thời gian nên chỉ tính được thời gian chờ với thread pool
+        if self.kind == "thread":
+            PASSWORD_POOL_WAIT_SECONDS.observe(max(started - submitted, 0.0), pool=self.name, op=op)
+        PASSWORD_HASH_SECONDS.observe(elapsed, pool=self.name, op=op)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run("verify", verify_password, plain_password, hashed_password)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - self.max_workers, 0),
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+password_pool = PasswordHasherPool(
+    name="password",
+    kind=settings.password_pool_kind,
+    max_workers=settings.password_pool_workers,
+    max_in_flight=settings.password_pool_max_in_flight,
+)
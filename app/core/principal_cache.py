@@ -0,0 +1,85 @@
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.core.redis_cache import RedisCache, redis_cache
+from app.models.user import User
+from app.schemas.user import UserRead
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Không serialize được kiểu {type(value).__name__}")
+
+
+class PrincipalCache:
+    """Cache thông tin user đã xác thực trong Redis, key theo username.
+
+    Mỗi entry gồm ``UserRead`` đã serialize cùng trạng thái active/deleted, có TTL.
+    Mọi thay đổi trên user phải gọi ``invalidate`` sau khi commit. Redis lỗi thì
+    coi như cache miss và đọc từ DB.
+    """
+
+    def __init__(self, cache: RedisCache, ttl: int, prefix: str = "principal:"):
+        self.cache = cache
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, username: str) -> str:
+        return f"{self.prefix}{username}"
+
+    @staticmethod
+    def to_entry(user: User) -> dict:
+        return {
+            "user": UserRead.model_validate(user).model_dump(),
+            "is_active": bool(user.is_active),
+            "deleted": user.deleted_at is not None,
+        }
+
+    async def get(self, username: str) -> Optional[dict]:
+        try:
+            redis = await self.cache.get_redis()
+            raw = await redis.get(self._key(username))
+        except Exception:
+            logger.warning("Không đọc được principal cache", exc_info=True)
+            return None
+        return json.loads(raw) if raw else None
+
+    async def set(self, username: str, entry: dict):
+        try:
+            redis = await self.cache.get_redis()
+            await redis.set(self._key(username), json.dumps(entry, default=_json_default), ex=self.ttl)
+        except Exception:
+            logger.warning("Không ghi được principal cache", exc_info=True)
+
+    async def invalidate(self, *usernames: str):
+        if not usernames:
+            return
+        try:
+            redis = await self.cache.get_redis()
+            await redis.delete(*(self._key(u) for u in usernames))
+        except Exception:
+            logger.warning("Không xoá được principal cache", exc_info=True)
+
+    async def load(self, db, username: str) -> Optional[dict]:
+        entry = await self.get(username)
+        record_cache("principal", entry is not None)
+        if entry is not None:
+            return entry
+        user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            return None
+        entry = self.to_entry(user)
+        await self.set(username, entry)
+        return entry
+
+
+principal_cache = PrincipalCache(redis_cache, ttl=settings.principal_cache_ttl)
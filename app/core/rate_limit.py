@@ -0,0 +1,156 @@
+import logging
+import math
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.helpers import APIException
+from app.core.metrics import Counter
+from app.core.redis_cache import RedisCache, redis_cache
+from app.enums.status_code import ResponseCode
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Số request bị từ chối do vượt giới hạn", ["rule"])
+RATE_LIMIT_FALLBACKS = Counter("rate_limit_fallback_total", "Số lần dùng bộ đếm trong process vì Redis lỗi")
+
+# Sliding window log trên sorted set, kiểm tra mọi key rồi mới ghi để lượt bị từ chối không bị tính
+# KEYS = các key cần kiểm tra; ARGV = now_ms, member, rồi từng cặp (limit, window_ms) theo thứ tự KEYS
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry, blocked = 0, 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[1 + i * 2])
+    local window = tonumber(ARGV[2 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        local wait = window
+        if oldest[2] then
+            wait = tonumber(oldest[2]) + window - now
+        end
+        if wait > retry then
+            retry, blocked = wait, i
+        end
+    end
+end
+if retry > 0 then
+    return {retry, blocked}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, ARGV[2 + i * 2])
+end
+return {0, 0}
+"""
+
+
+def parse_rule(value: str) -> Tuple[int, float]:
+    # "<số request>/<số giây>", vd "5/60"; số request <= 0 là tắt giới hạn
+    limit, window = value.split("/", 1)
+    return int(limit), float(window)
+
+
+class LocalSlidingWindow:
+    """Bộ đếm sliding window trong process, dùng khi Redis không truy cập được."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+
+    def hit(self, checks: List[Tuple[str, int, float]], now: float) -> Tuple[float, int]:
+        retry, blocked = 0.0, 0
+        for index, (key, limit, window) in enumerate(checks, start=1):
+            hits = self._hits.get(key)
+            if hits is None:
+                continue
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit and hits[0] + window - now > retry:
+                retry, blocked = hits[0] + window - now, index
+        if retry > 0:
+            return retry, blocked
+        for key, _, _ in checks:
+            self._hits.setdefault(key, deque()).append(now)
+            self._hits.move_to_end(key)
+        while len(self._hits) > self.max_keys:
+            self._hits.popitem(last=False)
+        return 0.0, 0
+
+
+class RateLimiter:
+    """Giới hạn số request theo sliding window, lưu trên Redis bằng một script Lua.
+
+    Mỗi lần kiểm tra là một round trip cho mọi key liên quan (vd. theo IP và theo
+    username) và chỉ ghi nhận khi tất cả đều còn hạn mức. Redis lỗi thì chuyển
+    sang bộ đếm trong process để vẫn chặn được dồn dập request.
+    """
+
+    def __init__(self, cache: RedisCache, prefix: str = "rl:"):
+        self.cache = cache
+        self.prefix = prefix
+        self.local = LocalSlidingWindow()
+        self._script = None
+
+    async def _redis_hit(self, checks: List[Tuple[str, int, float]], now: float) -> Tuple[float, int]:
+        redis = await self.cache.get_redis()
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+        args = [int(now * 1000), f"{int(now * 1000)}:{secrets.token_hex(4)}"]
+        for _, limit, window in checks:
+            args.extend([limit, int(window * 1000)])
+        retry_ms, blocked = await self._script(keys=[key for key, _, _ in checks], args=args)
+        return int(retry_ms) / 1000, int(blocked)
+
+    async def hit(self, rules: Iterable[Tuple[str, str, Tuple[int, float]]]) -> Optional[Tuple[str, float]]:
+        """Ghi nhận một request cho các ``(tên rule, giá trị, (limit, window))``.
+
+        Trả về ``None`` nếu được phép, ngược lại ``(tên rule, số giây cần chờ)``.
+        """
+        rules = [(name, value, rule) for name, value, rule in rules if value and rule[0] > 0]
+        if not rules:
+            return None
+        checks = [(f"{self.prefix}{name}:{value}", limit, window) for name, value, (limit, window) in rules]
+        now = time.time()
+        try:
+            retry, blocked = await self._redis_hit(checks, now)
+        except Exception:
+            logger.warning("Không dùng được Redis cho rate limit, chuyển sang bộ đếm trong process", exc_info=True)
+            RATE_LIMIT_FALLBACKS.inc()
+            retry, blocked = self.local.hit(checks, time.monotonic())
+        if retry <= 0:
+            return None
+        return rules[blocked - 1][0], retry
+
+
+rate_limiter = RateLimiter(redis_cache)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else None
+
+
+async def enforce_rate_limit(*rules: Tuple[str, str, str]):
+    # rules: (tên rule, giá trị định danh, cấu hình "<limit>/<giây>"); gọi trước mọi truy vấn DB/hash
+    if not settings.rate_limit_enabled:
+        return
+    rejected = await rate_limiter.hit((name, value, parse_rule(rule)) for name, value, rule in rules)
+    if rejected is None:
+        return
+    name, retry = rejected
+    RATE_LIMIT_REJECTIONS.inc(rule=name)
+    retry_after = max(1, math.ceil(retry))
+    raise APIException(
+        code=ResponseCode.TOO_MANY_REQUESTS,
+        message="Quá nhiều yêu cầu, vui lòng thử lại sau",
+        data={"retry_after": retry_after},
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -1,16 +1,24 @@
-import aioredis
-from fastapi import Depends
+from redis import asyncio as aioredis
 
 from app.core.config import settings
 
 class RedisCache:
-    def __init__(self, url: str = settings.redis_url):
+    def __init__(self, url: str = settings.redis_url, client=None):
         self.url = url
-        self.redis = None
+        # Có thể truyền sẵn client (vd. fakeredis.aioredis.FakeRedis) khi test
+        self.redis = client
 
     async def get_redis(self):
         if not self.redis:
-            self.redis = await aioredis.from_url(self.url, decode_responses=True)
+            self.redis = await aioredis.from_url(
+                self.url,
+                decode_responses=True,
+                socket_connect_timeout=settings.redis_timeout,
+                socket_timeout=settings.redis_timeout,
+            )
         return self.redis
 
+    def set_client(self, client):
+        self.redis = client
+
 redis_cache = RedisCache()
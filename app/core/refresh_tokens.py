@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import secrets
+import time
+from typing import Tuple
+
+from app.core.config import settings
+from app.core.redis_cache import RedisCache, redis_cache
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = family
+# ARGV = digest token được gửi lên, digest token mới, thời điểm hiện tại, TTL nhàn rỗi,
+#        user id trong token, tiền tố key thế hệ phiên
+# User id lấy từ họ token (ghi lúc tạo), không tin phần tiền tố do client gửi lên
+ROTATE_SCRIPT = """
+local family = redis.call('HMGET', KEYS[1], 'cur', 'sub', 'gen', 'deadline', 'uid')
+if not family[1] or not family[5] then
+    return {'missing'}
+end
+if family[5] ~= ARGV[5] then
+    return {'invalid'}
+end
+if family[1] ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {'reused'}
+end
+if family[3] ~= (redis.call('GET', ARGV[6] .. family[5]) or '0') then
+    redis.call('DEL', KEYS[1])
+    return {'revoked'}
+end
+local remaining = tonumber(family[4]) - tonumber(ARGV[3])
+if remaining <= 0 then
+    redis.call('DEL', KEYS[1])
+    return {'missing'}
+end
+redis.call('HSET', KEYS[1], 'cur', ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.min(tonumber(ARGV[4]), remaining))
+return {'ok', family[2], family[5]}
+"""
+
+# KEYS[1] = family, KEYS[2] = thế hệ phiên của user
+# ARGV = digest token đầu tiên, sub, thời điểm hết hạn tuyệt đối, TTL nhàn rỗi, user id
+CREATE_SCRIPT = """
+local generation = redis.call('GET', KEYS[2]) or '0'
+redis.call('HSET', KEYS[1], 'cur', ARGV[1], 'sub', ARGV[2], 'gen', generation, 'deadline', ARGV[3], 'uid', ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return generation
+"""
+
+
+class RefreshTokenError(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class RefreshTokenStore:
+    """Refresh token opaque lưu trong Redis, theo họ (family) và xoay vòng mỗi lần dùng.
+
+    Token có dạng ``<user_id>.<family_id>.<secret>``; Redis chỉ giữ SHA-256 của
+    secret hiện hành cùng user id trong hash ``<prefix>fam:<family_id>``; tiền tố
+    user id của token phải khớp user id đã lưu. Mỗi lần refresh là một
+    lệnh Lua (một round trip): kiểm tra, thay secret và gia hạn TTL. Gửi lại một
+    token đã bị thay thế bị coi là đánh cắp và xoá cả họ. Mỗi họ ghi lại thế hệ
+    phiên của user lúc tạo; ``revoke_all`` chỉ tăng bộ đếm ``<prefix>gen:<user_id>``
+    nên thu hồi mọi phiên của user là O(1).
+    """
+
+    def __init__(self, cache: RedisCache, ttl: int, max_lifetime: int, prefix: str = "rt:"):
+        self.cache = cache
+        self.ttl = ttl
+        self.max_lifetime = max_lifetime
+        self.prefix = prefix
+        self._rotate = None
+        self._create = None
+
+    def _family_key(self, family_id: str) -> str:
+        return f"{self.prefix}fam:{family_id}"
+
+    def _generation_key(self, user_id) -> str:
+        return f"{self.prefix}gen:{user_id}"
+
+    @staticmethod
+    def _digest(secret: str) -> str:
+        return hashlib.sha256(secret.encode()).hexdigest()
+
+    @staticmethod
+    def parse(token: str) -> Tuple[str, str, str]:
+        parts = token.split(".")
+        if len(parts) != 3 or not parts[0].isdigit() or not all(parts):
+            raise RefreshTokenError("invalid")
+        return parts[0], parts[1], parts[2]
+
+    async def _scripts(self):
+        redis = await self.cache.get_redis()
+        if self._create is None or self._create.registered_client is not redis:
+            self._create = redis.register_script(CREATE_SCRIPT)
+            self._rotate = redis.register_script(ROTATE_SCRIPT)
+        return self._create, self._rotate
+
+    async def issue(self, user_id: int, username: str) -> str:
+        # Tạo họ token mới khi đăng nhập
+        create, _ = await self._scripts()
+        family_id = secrets.token_urlsafe(16)
+        secret = secrets.token_urlsafe(32)
+        deadline = int(time.time()) + self.max_lifetime
+        await create(
+            keys=[self._family_key(family_id), self._generation_key(user_id)],
+            args=[self._digest(secret), username, deadline, min(self.ttl, self.max_lifetime), user_id],
+        )
+        return f"{user_id}.{family_id}.{secret}"
+
+    async def rotate(self, token: str) -> Tuple[str, int, str]:
+        """Đổi refresh token lấy token mới cùng họ, trả về ``(token mới, user id, username)``.
+
+        Ném ``RefreshTokenError`` với ``reason`` là ``invalid``, ``missing``,
+        ``reused`` hoặc ``revoked``.
+        """
+        user_id, family_id, secret = self.parse(token)
+        _, rotate = await self._scripts()
+        new_secret = secrets.token_urlsafe(32)
+        result = await rotate(
+            keys=[self._family_key(family_id)],
+            args=[self._digest(secret), self._digest(new_secret), int(time.time()), self.ttl, user_id, self._generation_key("")],
+        )
+        if result[0] != "ok":
+            if result[0] == "reused":
+                logger.warning("Refresh token bị dùng lại, đã thu hồi họ %s của user %s", family_id, user_id)
+            raise RefreshTokenError(result[0])
+        return f"{user_id}.{family_id}.{new_secret}", int(result[2]), result[1]
+
+    async def revoke(self, token: str):
+        # Đăng xuất một phiên: xoá họ chứa token
+        _, family_id, _ = self.parse(token)
+        redis = await self.cache.get_redis()
+        await redis.delete(self._family_key(family_id))
+
+    async def revoke_all(self, user_id: int):
+        # Các họ cũ còn trong Redis sẽ bị từ chối ở lần refresh kế tiếp rồi hết hạn theo TTL
+        redis = await self.cache.get_redis()
+        await redis.incr(self._generation_key(user_id))
+
+
+refresh_token_store = RefreshTokenStore(
+    redis_cache,
+    ttl=settings.refresh_token_ttl,
+    max_lifetime=settings.refresh_token_max_lifetime,
+)
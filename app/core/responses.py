@@ -0,0 +1,74 @@
+import functools
+import inspect
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app.core.helpers import APIResponse
+
+
+def _default(value):
+    # orjson tự xử lý dict/list/datetime/enum; model Pydantic dùng serializer của chính nó (giữ json_encoders)
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_python(value, mode="json")
+    raise TypeError(f"Không serialize được kiểu {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+        # Một lượt serialize trong pydantic-core, không validate lại
+        return content.__pydantic_serializer__.to_json(content)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class APIJSONResponse(JSONResponse):
+    """JSONResponse dùng orjson, nhận trực tiếp ``APIResponse`` hoặc dict/list."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EnvelopeRoute(APIRoute):
+    """Route trả ``APIResponse`` thẳng ra ``APIJSONResponse``.
+
+    Mặc định FastAPI validate lại giá trị trả về theo ``response_model`` rồi chạy
+    ``jsonable_encoder``, nên mỗi phần tử của danh sách lớn bị chuyển đổi nhiều
+    lần. Ở đây endpoint async trả ``APIResponse`` được serialize đúng một lần;
+    ``response_model`` vẫn giữ cho OpenAPI. Header/status đặt qua tham số
+    ``Response`` của endpoint (vd. ETag) vẫn được giữ lại.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _envelope_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _envelope_endpoint(endpoint):
+    signature = inspect.signature(endpoint)
+    # FastAPI chỉ inject Response vào một tham số, dùng lại tham số của endpoint nếu đã khai báo
+    name = next((n for n, p in signature.parameters.items() if p.annotation is Response), None)
+    added = name is None
+    if added:
+        name = "_envelope_response"
+        signature = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ])
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        sub_response = kwargs.pop(name) if added else kwargs[name]
+        result = await endpoint(**kwargs)
+        if not isinstance(result, APIResponse):
+            return result
+        response = APIJSONResponse(result, status_code=sub_response.status_code or 200)
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    wrapper.__signature__ = signature
+    return wrapper
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Iterable, Set
+
+from sqlalchemy import delete, exists, insert, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.helpers import APIException
+from app.core.redis_cache import RedisCache, redis_cache
+from app.enums.status_code import ResponseCode
+from app.models.role import Role, role_closure, role_parents
+
+logger = logging.getLogger(__name__)
+
+# Duy trì role_closure theo role_parents trong cùng transaction, caller tự commit.
+# Mọi thay đổi cạnh (role -> cha) chỉ đụng tới các dòng closure của cây con bên dưới role đó.
+# Caller giữ ``hierarchy_lock`` từ trước khi đọc closure tới sau commit.
+
+# Chỉ xoá khoá nếu vẫn là của mình (khoá có thể đã hết hạn và bị request khác lấy)
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class HierarchyLock:
+    """Tuần tự hoá các thay đổi cây kế thừa giữa mọi worker.
+
+    Kiểm tra vòng đọc closure đã commit, nên hai request thêm cạnh song song (vd.
+    ``A -> B`` và ``B -> A``, hoặc hai cạnh khép một đường đi dài) đều qua kiểm tra
+    và cùng ghi. Khoá Redis ``SET NX PX`` (như khoá của purge job) được giữ tới sau
+    commit; khoá asyncio trong process tránh các request cùng worker tranh nhau gọi
+    Redis. Không có Redis thì chỉ còn khoá trong process.
+    """
+
+    def __init__(self, cache: RedisCache, ttl: float, wait: float, key: str = "role_hierarchy:lock"):
+        self.cache = cache
+        self.ttl = ttl
+        self.wait = wait
+        self.key = key
+        self._local = asyncio.Lock()
+
+    def _busy(self) -> APIException:
+        return APIException(
+            code=ResponseCode.SERVICE_BUSY,
+            message="Cây kế thừa role đang được cập nhật, vui lòng thử lại sau",
+            status_code=503
+        )
+
+    async def _acquire_redis(self, token: str, deadline: float):
+        try:
+            redis = await self.cache.get_redis()
+        except Exception:
+            logger.warning("Không kết nối được Redis, chỉ khoá cây kế thừa trong process", exc_info=True)
+            return None
+        while True:
+            try:
+                if await redis.set(self.key, token, nx=True, px=max(1, int(self.ttl * 1000))):
+                    return redis
+            except Exception:
+                logger.warning("Không lấy được khoá cây kế thừa, chỉ khoá trong process", exc_info=True)
+                return None
+            if time.monotonic() >= deadline:
+                raise self._busy()
+            await asyncio.sleep(0.05)
+
+    @asynccontextmanager
+    async def __call__(self):
+        deadline = time.monotonic() + self.wait
+        try:
+            await asyncio.wait_for(self._local.acquire(), self.wait)
+        except asyncio.TimeoutError:
+            raise self._busy()
+        try:
+            token = uuid.uuid4().hex
+            redis = await self._acquire_redis(token, deadline)
+            try:
+                yield
+            finally:
+                if redis is not None:
+                    try:
+                        await redis.eval(RELEASE_SCRIPT, 1, self.key, token)
+                    except Exception:
+                        logger.warning("Không nhả được khoá cây kế thừa, chờ hết hạn", exc_info=True)
+        finally:
+            self._local.release()
+
+
+hierarchy_lock = HierarchyLock(redis_cache, ttl=settings.role_hierarchy_lock_ttl, wait=settings.role_hierarchy_lock_wait)
+
+
+async def add_roles(db: AsyncSession, role_ids: Iterable[int]):
+    # Dòng (r, r) để quyền gán trực tiếp cho role đi cùng một phép join với quyền kế thừa
+    rows = [{"ancestor_id": r, "descendant_id": r} for r in role_ids]
+    if rows:
+        await db.execute(insert(role_closure).values(rows))
+
+
+def backfill_self_rows(bind) -> int:
+    """Thêm dòng ``(r, r)`` cho các role chưa có (vd. role tạo trước khi có bảng closure), chạy lúc khởi động.
+
+    Thiếu dòng này user mất toàn bộ quyền gán trực tiếp cho role. Nhiều worker cùng
+    chạy có thể va khoá chính; khi đó worker còn lại đã backfill xong nên bỏ qua lỗi.
+    """
+    missing = (
+        select(Role.id, Role.id)
+        .where(~exists().where(role_closure.c.ancestor_id == Role.id, role_closure.c.descendant_id == Role.id))
+    )
+    try:
+        with bind.begin() as conn:
+            return conn.execute(insert(role_closure).from_select(["ancestor_id", "descendant_id"], missing)).rowcount
+    except IntegrityError:
+        logger.info("Dòng closure (r, r) đã được worker khác backfill")
+        return 0
+
+
+async def descendants(db: AsyncSession, role_id: int) -> Set[int]:
+    result = await db.scalars(select(role_closure.c.descendant_id).where(role_closure.c.ancestor_id == role_id))
+    return set(result.all()) | {role_id}
+
+
+async def _sync_subtree(db: AsyncSession, role_id: int) -> Set[int]:
+    """Tính lại tổ tiên nằm ngoài cây con của ``role_id`` sau khi cạnh của nó thay đổi.
+
+    Quan hệ giữa hai role cùng trong cây con không đi qua cạnh vừa đổi nên giữ nguyên;
+    tổ tiên bên ngoài của mỗi role ``d`` trong cây con là hợp tổ tiên của các cha
+    ngoài cây con của mọi ``x`` (trong cây con) là tổ tiên của ``d``.
+    """
+    subtree = await descendants(db, role_id)
+    inner = defaultdict(set)
+    for ancestor, descendant in (await db.execute(
+        select(role_closure.c.ancestor_id, role_closure.c.descendant_id)
+        .where(role_closure.c.ancestor_id.in_(subtree), role_closure.c.descendant_id.in_(subtree))
+    )).all():
+        inner[descendant].add(ancestor)
+    for r in subtree:
+        inner[r].add(r)
+    external_parents = defaultdict(set)
+    for child, parent in (await db.execute(
+        select(role_parents.c.role_id, role_parents.c.parent_id)
+        .where(role_parents.c.role_id.in_(subtree), role_parents.c.parent_id.not_in(subtree))
+    )).all():
+        external_parents[child].add(parent)
+    parents = set().union(*external_parents.values())
+    parent_ancestors = defaultdict(set)
+    if parents:
+        for ancestor, descendant in (await db.execute(
+            select(role_closure.c.ancestor_id, role_closure.c.descendant_id).where(role_closure.c.descendant_id.in_(parents))
+        )).all():
+            parent_ancestors[descendant].add(ancestor)
+        for p in parents:
+            parent_ancestors[p].add(p)
+
+    desired = {
+        (a, d)
+        for d in subtree
+        for x in inner[d]
+        for p in external_parents.get(x, ())
+        for a in parent_ancestors[p]
+    }
+    current = set((await db.execute(
+        select(role_closure.c.ancestor_id, role_closure.c.descendant_id)
+        .where(role_closure.c.descendant_id.in_(subtree), role_closure.c.ancestor_id.not_in(subtree))
+    )).all())
+    stale = current - desired
+    if stale:
+        await db.execute(delete(role_closure).where(
+            tuple_(role_closure.c.ancestor_id, role_closure.c.descendant_id).in_(sorted(stale))
+        ))
+    missing = desired - current
+    if missing:
+        await db.execute(insert(role_closure).values([{"ancestor_id": a, "descendant_id": d} for a, d in sorted(missing)]))
+    return subtree
+
+
+async def add_parent(db: AsyncSession, role_id: int, parent_id: int) -> Set[int]:
+    # Trả về cây con bị ảnh hưởng (role_id và các role kế thừa nó)
+    if parent_id == role_id or parent_id in await descendants(db, role_id):
+        raise APIException(
+            code=ResponseCode.BAD_REQUEST,
+            message="Không thể kế thừa vì tạo thành vòng"
+        )
+    edge = await db.scalar(
+        select(role_parents.c.role_id).where(role_parents.c.role_id == role_id, role_parents.c.parent_id == parent_id)
+    )
+    if edge is not None:
+        raise APIException(
+            code=ResponseCode.UNAUTHORIZED,
+            message="Role đã kế thừa role này"
+        )
+    await db.execute(insert(role_parents).values(role_id=role_id, parent_id=parent_id))
+    return await _sync_subtree(db, role_id)
+
+
+async def remove_parent(db: AsyncSession, role_id: int, parent_id: int) -> Set[int]:
+    result = await db.execute(
+        delete(role_parents).where(role_parents.c.role_id == role_id, role_parents.c.parent_id == parent_id)
+    )
+    if result.rowcount == 0:
+        raise APIException(
+            code=ResponseCode.UNAUTHORIZED,
+            message="Role chưa kế thừa role này"
+        )
+    return await _sync_subtree(db, role_id)
+
+
+async def detach(db: AsyncSession, role_ids: Iterable[int]) -> Set[int]:
+    # Gỡ role (vd. khi xoá mềm) khỏi cây kế thừa: bỏ mọi cạnh tới cha và tới con, từng cạnh một
+    affected = set()
+    role_ids = set(role_ids)
+    if not role_ids:
+        return affected
+    edges = (await db.execute(
+        select(role_parents.c.role_id, role_parents.c.parent_id)
+        .where(or_(role_parents.c.role_id.in_(role_ids), role_parents.c.parent_id.in_(role_ids)))
+    )).all()
+    for child, parent in edges:
+        affected |= await remove_parent(db, child, parent)
+    return affected
+
+
+def build_closure(role_ids: Iterable[int], edges: Iterable[tuple]) -> Set[tuple]:
+    """Tính toàn bộ closure từ danh sách cạnh ``(role_id, parent_id)``, dùng cho script dựng lại."""
+    parents = defaultdict(set)
+    for child, parent in edges:
+        parents[child].add(parent)
+    closure = set()
+    for role_id in role_ids:
+        seen, stack = {role_id}, [role_id]
+        while stack:
+            for parent in parents.get(stack.pop(), ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        closure.update((a, role_id) for a in seen)
+    return closure
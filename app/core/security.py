@@ -1,10 +1,13 @@
+import base64
+import hashlib
+import json
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from app.core.config import settings
 
 SECRET_KEY = settings.SECRET_KEY  # Nên lấy từ biến môi trường thực tế
-ALGORITHM = "HS256"
+ALGORITHM = settings.jwt_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -15,9 +18,75 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def jwk_thumbprint(public_jwk: dict) -> str:
+    # RFC 7638: SHA-256 trên JSON chuẩn hoá của các trường bắt buộc, dùng làm kid
+    required = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}[public_jwk["kty"]]
+    canonical = json.dumps({k: public_jwk[k] for k in required}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+def _read_keys(paths: str):
+    for path in (p.strip() for p in paths.split(",")):
+        if path:
+            with open(path) as f:
+                yield f.read()
+
+class KeyRing:
+    """Khoá ký/xác thực access token.
+
+    HS256 dùng ``SECRET_KEY``. Với RS256/ES256, khoá đầu tiên trong
+    ``JWT_PRIVATE_KEYS`` dùng để ký; các khoá còn lại cùng ``JWT_PUBLIC_KEYS``
+    (khoá cũ đã xoay vòng) chỉ dùng để xác thực và được công bố ở JWKS.
+    """
+
+    def __init__(self, algorithm: str, secret: str, private_keys: str = "", public_keys: str = ""):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.signing_key = None
+        self.active_kid = None
+        self.public_keys = {}
+        if algorithm.startswith("HS"):
+            return
+        for index, pem in enumerate(_read_keys(private_keys)):
+            key = jwk.construct(pem, algorithm)
+            kid = self._add_public(key.public_key())
+            if index == 0:
+                self.signing_key, self.active_kid = key, kid
+        for pem in _read_keys(public_keys):
+            self._add_public(jwk.construct(pem, algorithm))
+        if self.signing_key is None:
+            raise ValueError(f"JWT_PRIVATE_KEYS là bắt buộc với thuật toán {algorithm}")
+
+    def _add_public(self, public_key) -> str:
+        public_jwk = public_key.to_dict()
+        kid = jwk_thumbprint(public_jwk)
+        self.public_keys[kid] = (public_key, {**public_jwk, "kid": kid, "use": "sig", "alg": self.algorithm})
+        return kid
+
+    def sign(self, claims: dict) -> str:
+        if self.signing_key is None:
+            return jwt.encode(claims, self.secret, algorithm=self.algorithm)
+        return jwt.encode(claims, self.signing_key, algorithm=self.algorithm, headers={"kid": self.active_kid})
+
+    def decode(self, token: str, options: dict = None) -> dict:
+        if self.signing_key is None:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm], options=options)
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self.public_keys:
+            raise JWTError("Không tìm thấy khoá xác thực cho kid")
+        return jwt.decode(token, self.public_keys[kid][0], algorithms=[self.algorithm], options=options)
+
+    def jwks(self) -> dict:
+        return {"keys": [public_jwk for _, public_jwk in self.public_keys.values()]}
+
+key_ring = KeyRing(ALGORITHM, SECRET_KEY, settings.jwt_private_keys, settings.jwt_public_keys)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = key_ring.sign(to_encode)
     return encoded_jwt
+
+def decode_access_token(token: str, verify_exp: bool = True) -> dict:
+    # Ném JWTError nếu chữ ký/kid/hạn không hợp lệ
+    return key_ring.decode(token, options={"verify_exp": verify_exp})
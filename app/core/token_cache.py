@@ -0,0 +1,66 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.core.security import decode_access_token
+
+
+class VerifiedTokenCache:
+    """LRU giới hạn kích thước cho các access token đã xác thực chữ ký.
+
+    Key là SHA-256 của token (không giữ token gốc trong bộ nhớ), value là payload
+    đã giải mã cùng thời điểm ``exp``. Entry tự hết hiệu lực khi token hết hạn,
+    nên request lặp lại với cùng bearer token bỏ qua hoàn toàn bước verify.
+    Payload trả về dùng chung giữa các request, chỉ được đọc.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] <= time.time():
+            del self._entries[key]
+            cached = None
+        record_cache("token", cached is not None)
+        if cached is None:
+            return None
+        self._entries.move_to_end(key)
+        return cached[1]
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = (exp, payload)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def verify(self, token: str) -> dict:
+        # Ném JWTError nếu token không hợp lệ hoặc đã hết hạn
+        payload = self.get(token)
+        if payload is not None:
+            return payload
+        payload = decode_access_token(token)
+        self.put(token, payload)
+        return payload
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = VerifiedTokenCache(max_entries=settings.token_cache_max_entries)
@@ -1,9 +1,65 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.db.pool import pool_options, register_engine
+from app.core.instrumentation import instrument_engine
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {})
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    # Đổi driver đồng bộ (mysqlconnector, pymysql, ...) sang driver async tương ứng
+    sa_url = make_url(url)
+    backend = sa_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Không hỗ trợ async cho database '{backend}'")
+    return sa_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def split_urls(value: str) -> list:
+    return [u.strip() for u in value.split(",") if u.strip()]
+
+def make_engine(url: str, label: str):
+    sync_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+        **pool_options(url, label),
+    )
+    register_engine(label, sync_engine)
+    instrument_engine(sync_engine, label)
+    return sync_engine
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Read replica: mỗi URL một engine/pool riêng, request chỉ đọc được phân phối vòng tròn (app.db.routing)
+REPLICA_DATABASE_URLS = split_urls(settings.replica_database_urls)
+replica_engines = [make_engine(url, f"replica{i}") for i, url in enumerate(REPLICA_DATABASE_URLS)]
+ReplicaSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+
+# Chế độ async: chỉ khởi tạo khi bật DB_ASYNC để không bắt buộc cài driver async
+async_engine = None
+AsyncSessionLocal = None
+AsyncReplicaSessionLocals = []
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(SQLALCHEMY_DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, "primary_async", is_async=True))
+    register_engine("primary_async", async_engine)
+    instrument_engine(async_engine, "primary_async")
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    ASYNC_REPLICA_DATABASE_URLS = split_urls(settings.async_replica_database_urls) or [to_async_url(u) for u in REPLICA_DATABASE_URLS]
+    for i, url in enumerate(ASYNC_REPLICA_DATABASE_URLS):
+        label = f"replica{i}_async"
+        replica_async_engine = create_async_engine(url, **pool_options(url, label, is_async=True))
+        register_engine(label, replica_async_engine)
+        instrument_engine(replica_async_engine, label)
+        AsyncReplicaSessionLocals.append(async_sessionmaker(bind=replica_async_engine, autoflush=False, expire_on_commit=False))
@@ -0,0 +1,81 @@
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DB_POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Thời gian chờ lấy connection từ pool", ["pool"], buckets=POOL_WAIT_BUCKETS)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Số lần chờ connection quá pool_timeout", ["pool"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Số connection đang được sử dụng", ["pool"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Số connection vượt pool_size đang mở", ["pool"])
+DB_POOL_SIZE = Gauge("db_pool_size", "pool_size cấu hình", ["pool"])
+
+_engines = {}
+
+
+class _WaitTimingMixin:
+    # Đo thời gian chờ trong _do_get; nhãn lấy từ pool_logging_name để giữ nguyên sau recreate()
+    def _do_get(self):
+        label = self.logging_name or "default"
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc(pool=label)
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started, pool=label)
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, label: str, is_async: bool = False) -> dict:
+    # SQLite in-memory dùng SingletonThreadPool/StaticPool nên không cấu hình kích thước pool
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() == "sqlite" and sa_url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_logging_name": label,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def register_engine(label: str, engine):
+    _engines[label] = engine
+
+
+def pool_stats() -> dict:
+    stats = {}
+    for label, engine in _engines.items():
+        pool = getattr(engine, "sync_engine", engine).pool
+        if not isinstance(pool, QueuePool):
+            stats[label] = {"status": pool.status()}
+            continue
+        DB_POOL_CHECKED_OUT.set(pool.checkedout(), pool=label)
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0), pool=label)
+        DB_POOL_SIZE.set(pool.size(), pool=label)
+        stats[label] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "timeouts": DB_POOL_TIMEOUTS.value(pool=label),
+            "wait_seconds": DB_POOL_WAIT_SECONDS.snapshot().get((label,)),
+        }
+    return stats
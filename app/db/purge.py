@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.core.etag import PERMISSIONS, ROLES, ROLE_PERMISSIONS
+from app.core.redis_cache import RedisCache, redis_cache
+from app.db.database import SessionLocal
+from app.models.permission import Permission
+from app.models.role import Role, role_closure, role_parents, role_permissions
+from app.models.user import User, user_roles
+from app.utils.time import get_vietnam_time
+
+logger = logging.getLogger(__name__)
+
+# Model -> các cột khoá ngoại trỏ tới nó, xoá trước để không vi phạm ràng buộc
+PURGE_TARGETS = (
+    (Permission, (role_permissions.c.permission_id,)),
+    (Role, (
+        role_permissions.c.role_id,
+        user_roles.c.role_id,
+        role_parents.c.role_id,
+        role_parents.c.parent_id,
+        role_closure.c.ancestor_id,
+        role_closure.c.descendant_id,
+    )),
+    (User, (user_roles.c.user_id,)),
+)
+
+
+def purge_soft_deleted(session_factory=SessionLocal, retention_days: int = settings.soft_delete_retention_days, batch_size: int = settings.purge_batch_size) -> dict:
+    """Xoá hẳn các bản ghi đã xoá mềm quá ``retention_days`` ngày, trả về số dòng đã xoá theo bảng.
+
+    Mỗi lô ``batch_size`` id là một transaction riêng để không giữ khoá lâu trên bảng lớn;
+    lô được chọn qua index ``(deleted_at, ...)``.
+    """
+    cutoff = get_vietnam_time() - timedelta(days=retention_days)
+    purged = {}
+    with session_factory() as db:
+        for model, association_columns in PURGE_TARGETS:
+            total = 0
+            while True:
+                ids = db.scalars(
+                    select(model.id)
+                    .where(model.deleted_at < cutoff)
+                    .order_by(model.deleted_at)
+                    .limit(batch_size)
+                    .execution_options(include_deleted=True)
+                ).all()
+                if not ids:
+                    break
+                for column in association_columns:
+                    db.execute(delete(column.table).where(column.in_(ids)))
+                db.execute(delete(model).where(model.id.in_(ids)))
+                db.commit()
+                total += len(ids)
+                if len(ids) < batch_size:
+                    break
+            purged[model.__tablename__] = total
+    return purged
+
+
+class PurgeJob:
+    """Chạy ``purge_soft_deleted`` định kỳ trong nền.
+
+    Khi chạy nhiều worker, chỉ worker giữ được khoá Redis (``SET NX EX``) của chu kỳ
+    đó mới purge; không có Redis thì mỗi worker tự chạy (các lô xoá vẫn an toàn khi
+    chạy song song).
+    """
+
+    def __init__(self, cache: RedisCache, interval: float, lock_key: str = "purge:soft_deleted:lock"):
+        self.cache = cache
+        self.interval = interval
+        self.lock_key = lock_key
+        self._task = None
+
+    async def _acquire(self) -> bool:
+        try:
+            redis = await self.cache.get_redis()
+            return bool(await redis.set(self.lock_key, "1", nx=True, ex=max(1, int(self.interval))))
+        except Exception:
+            logger.warning("Không lấy được khoá purge, chạy purge không khoá", exc_info=True)
+            return True
+
+    async def run_once(self) -> dict:
+        if not await self._acquire():
+            return {}
+        purged = await run_in_threadpool(purge_soft_deleted)
+        if purged.get(Permission.__tablename__) or purged.get(Role.__tablename__):
+            await catalog_cache.invalidate(PERMISSIONS, ROLES, ROLE_PERMISSIONS)
+        if any(purged.values()):
+            logger.info("Đã purge bản ghi xoá mềm: %s", purged)
+        return purged
+
+    async def loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Purge bản ghi xoá mềm thất bại", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self.loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+purge_job = PurgeJob(redis_cache, interval=settings.purge_interval_seconds)
@@ -0,0 +1,65 @@
+import itertools
+import math
+import time
+from contextvars import ContextVar
+
+from starlette.requests import Request
+
+from app.core.config import settings
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+_round_robin = itertools.count()
+
+
+def choose_session_factory(primary, replicas: list):
+    # Request chỉ đọc (và không trong cửa sổ read-your-writes) dùng replica theo vòng tròn
+    if replicas and _use_replica.get():
+        return replicas[next(_round_robin) % len(replicas)]
+    return primary
+
+
+class ReplicaRoutingMiddleware:
+    """Đánh dấu request nào được đọc từ replica.
+
+    GET/HEAD/OPTIONS đi replica, các method còn lại đi primary. Sau một request ghi,
+    client nhận cookie ``<tên>=<thời điểm hết hạn>`` để các lần đọc trong
+    ``DB_STICKY_PRIMARY_SECONDS`` giây tiếp theo vẫn đi primary (đọc được dữ liệu
+    vừa ghi dù replica chưa đồng bộ kịp).
+    """
+
+    def __init__(self, app, cookie_name: str = settings.db_sticky_cookie, window: float = settings.db_sticky_primary_seconds):
+        self.app = app
+        self.cookie_name = cookie_name
+        self.window = window
+
+    def _sticky(self, scope) -> bool:
+        value = Request(scope).cookies.get(self.cookie_name)
+        try:
+            return value is not None and float(value) > time.time()
+        except ValueError:
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        is_read = scope["method"] in SAFE_METHODS
+        token = _use_replica.set(is_read and not self._sticky(scope))
+        send_wrapper = send
+        if not is_read and self.window > 0:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    # Tính mốc hết hạn lúc trả response, sau khi dữ liệu đã commit
+                    cookie = (
+                        f"{self.cookie_name}={time.time() + self.window:.3f}; Max-Age={math.ceil(self.window)}; "
+                        "Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _use_replica.reset(token)
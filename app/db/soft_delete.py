@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+# Execution option để tắt bộ lọc xoá mềm cho một truy vấn:
+#   await db.scalars(select(Role).execution_options(include_deleted=True))
+INCLUDE_DELETED = "include_deleted"
+
+
+class SoftDeleteMixin:
+    """Model có cột ``deleted_at``; mọi truy vấn ORM mặc định bỏ qua bản ghi đã xoá mềm."""
+
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_soft_deleted(execute_state):
+    # Áp dụng cho cả entity trong SELECT, JOIN và subquery; lazy/relationship load kế thừa từ truy vấn gốc
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
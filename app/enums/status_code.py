@@ -6,7 +6,9 @@ class ResponseCode(int, Enum):
     UNAUTHORIZED = 401
     FORBIDDEN = 403
     NOT_FOUND = 404
+    TOO_MANY_REQUESTS = 429
     INTERNAL_ERROR = 500
+    SERVICE_BUSY = 503
 
     VALIDATION_ERROR = 1001
     USER_NOT_FOUND = 1002
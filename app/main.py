@@ -1,11 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from app.core.responses import APIJSONResponse
 from app.core.helpers import APIException
-from app.api import auth, permission, role
+from app.core.config import settings
+from app.enums.status_code import ResponseCode
+from app.core.instrumentation import RequestMetricsMiddleware
+from app.db.database import replica_engines
+from app.db.routing import ReplicaRoutingMiddleware
+from app.core.password_pool import password_pool
+from app.core.catalog_cache import catalog_cache
+from app.db.purge import purge_job
+from app.db.database import engine
+from app.core.role_hierarchy import backfill_self_rows
+from starlette.concurrency import run_in_threadpool
+from app.core.audit import audit_log
+from app.api import auth, permission, role, export, system, well_known, audit, authz
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(backfill_self_rows, engine)
+    catalog_cache.start()
+    purge_job.start()
+    audit_log.start()
+    yield
+    await audit_log.stop()
+    await purge_job.stop()
+    await catalog_cache.stop()
+    password_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=APIJSONResponse)
 
 # Cấu hình cho phép tất cả origin (có thể điều chỉnh lại nếu cần)
 app.add_middleware(
@@ -16,18 +43,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
+
+if replica_engines:
+    app.add_middleware(ReplicaRoutingMiddleware)
+
 
 @app.exception_handler(APIException)
 async def api_exception_handler(request: Request, exc: APIException):
     # exc.detail là dict đã đúng cấu trúc APIResponse
-    return JSONResponse(
+    if exc.detail["code"] == ResponseCode.SERVICE_BUSY:
+        # Quá tải thì trả HTTP 503 thật để load balancer/client lùi lại; các mã khác vẫn HTTP 200
+        return APIJSONResponse(
+            status_code=503,
+            content=exc.detail,
+            headers={"Retry-After": str(settings.service_busy_retry_after), **(exc.headers or {})}
+        )
+    return APIJSONResponse(
         status_code=200,
-        content=exc.detail
+        content=exc.detail,
+        headers=exc.headers
     )
 
 app.include_router(auth.router)
 app.include_router(permission.router)
 app.include_router(role.router)
+app.include_router(export.router)
+app.include_router(system.router)
+app.include_router(well_known.router)
+app.include_router(audit.router)
+app.include_router(authz.router)
 
 
 @app.get("/")
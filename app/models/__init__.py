@@ -1,3 +1,4 @@
 from .user import User
 from .role import Role
 from .permission import Permission
+from .audit_log import AuditLog
@@ -0,0 +1,22 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, String
+from app.db.database import Base
+from app.utils.time import get_vietnam_time
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+    # Chỉ ghi thêm, đọc theo trang id giảm dần: theo đối tượng, theo người thực hiện hoặc theo hành động
+    __table_args__ = (
+        Index("ix_audit_logs_entity", "entity_type", "entity_id", "id"),
+        Index("ix_audit_logs_actor_id", "actor", "id"),
+        Index("ix_audit_logs_action_id", "action", "id"),
+    )
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # vd. role.create, role.permission.add
+    action = Column(String(50), nullable=False)
+    entity_type = Column(String(50), nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    # username trong token, None nếu request không kèm token hợp lệ
+    actor = Column(String(50), nullable=True)
+    ip = Column(String(45), nullable=True)
+    detail = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=get_vietnam_time, nullable=False)
@@ -1,14 +1,19 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from app.db.database import Base
+from app.db.soft_delete import SoftDeleteMixin
 from sqlalchemy.sql import func
 from sqlalchemy import DateTime
 from app.utils.time import get_vietnam_time
 
-class Permission(Base):
+class Permission(SoftDeleteMixin, Base):
     __tablename__ = "permissions"
+    # Truy vấn luôn kèm deleted_at IS NULL: danh sách theo id / theo tiền tố name, và purge theo deleted_at
+    __table_args__ = (
+        Index("ix_permissions_deleted_at_id", "deleted_at", "id"),
+        Index("ix_permissions_deleted_at_name", "deleted_at", "name"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), default=get_vietnam_time, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=get_vietnam_time, onupdate=get_vietnam_time, nullable=False)
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
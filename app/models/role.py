@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Table, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.db.soft_delete import SoftDeleteMixin
 from sqlalchemy import DateTime
 from app.utils.time import get_vietnam_time
 
@@ -11,12 +12,34 @@ role_permissions = Table(
     Column("permission_id", Integer, ForeignKey("permissions.id"), primary_key=True),
 )
 
-class Role(Base):
+# Cạnh kế thừa: role_id được hưởng toàn bộ quyền của parent_id
+role_parents = Table(
+    "role_parents",
+    Base.metadata,
+    Column("role_id", Integer, ForeignKey("roles.id"), primary_key=True),
+    Column("parent_id", Integer, ForeignKey("roles.id"), primary_key=True),
+    Index("ix_role_parents_parent_id", "parent_id"),
+)
+
+# Bao đóng bắc cầu của role_parents, gồm cả dòng (r, r) cho mỗi role: descendant_id hưởng quyền của ancestor_id.
+# Được cập nhật cùng transaction với role_parents (app.core.role_hierarchy)
+role_closure = Table(
+    "role_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("roles.id"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("roles.id"), primary_key=True),
+    Index("ix_role_closure_descendant_ancestor", "descendant_id", "ancestor_id"),
+)
+
+class Role(SoftDeleteMixin, Base):
     __tablename__ = "roles"
+    __table_args__ = (
+        Index("ix_roles_deleted_at_id", "deleted_at", "id"),
+        Index("ix_roles_deleted_at_name", "deleted_at", "name"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(String(255), nullable=True)
     permissions = relationship("Permission", secondary=role_permissions, backref="roles")
     created_at = Column(DateTime(timezone=True), default=get_vietnam_time, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=get_vietnam_time, onupdate=get_vietnam_time, nullable=False)
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Index, Integer, String, Boolean, ForeignKey, Table
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.db.soft_delete import SoftDeleteMixin
 from sqlalchemy import DateTime
 from app.utils.time import get_vietnam_time
 
@@ -11,8 +12,12 @@ user_roles = Table(
     Column("role_id", Integer, ForeignKey("roles.id"), primary_key=True),
 )
 
-class User(Base):
+class User(SoftDeleteMixin, Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_username_deleted_at", "username", "deleted_at"),
+        Index("ix_users_deleted_at", "deleted_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
@@ -20,5 +25,4 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), default=get_vietnam_time, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=get_vietnam_time, onupdate=get_vietnam_time, nullable=False)
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
     roles = relationship("Role", secondary=user_roles, backref="users")
@@ -0,0 +1,15 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Optional
+
+class AuditLogRead(BaseModel):
+    id: int
+    action: str
+    entity_type: str
+    entity_id: Optional[int] = None
+    actor: Optional[str] = None
+    ip: Optional[str] = None
+    detail: Optional[Any] = None
+    created_at: datetime
+    class Config:
+        from_attributes = True
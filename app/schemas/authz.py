@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Literal, Tuple, Union
+
+class AuthzCheckItem(BaseModel):
+    user_id: int
+    # Một tên permission hoặc danh sách tên
+    permission: Union[str, List[str]]
+    # all: cần đủ mọi permission trong danh sách; any: chỉ cần một
+    mode: Literal["all", "any"] = "all"
+
+class AuthzCheckRequest(BaseModel):
+    # Mỗi phần tử là object hoặc dạng gọn [user_id, "tên"] / [user_id, ["tên", ...]] (mode all)
+    checks: List[Union[AuthzCheckItem, Tuple[int, Union[str, List[str]]]]]
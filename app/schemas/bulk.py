@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    # created | updated | deleted | conflict | not_found
+    status: str
+    id: Optional[int] = None
+    message: Optional[str] = None
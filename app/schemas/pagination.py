@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # id của phần tử cuối trang, truyền lại qua tham số cursor để lấy trang tiếp theo
+    next_cursor: Optional[int] = None
+    total: Optional[int] = None
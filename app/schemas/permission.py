@@ -11,6 +11,9 @@ class PermissionCreate(PermissionBase):
 class PermissionUpdate(PermissionBase):
     pass
 
+class PermissionBulkUpdate(PermissionBase):
+    id: int
+
 class PermissionRead(PermissionBase):
     id: int
     class Config:
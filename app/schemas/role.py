@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 
 class RoleBase(BaseModel):
     name: str
@@ -11,6 +11,15 @@ class RoleCreate(RoleBase):
 class RoleUpdate(RoleBase):
     pass
 
+class RoleBulkUpdate(RoleBase):
+    id: int
+
+class RolePermissionsUpdate(BaseModel):
+    permission_ids: List[int]
+    # replace: thay toàn bộ; add/remove: chỉ thêm/bớt các id trong danh sách
+    mode: Literal["replace", "add", "remove"] = "replace"
+    return_permissions: bool = True
+
 class RoleRead(RoleBase):
     id: int
     class Config:
@@ -0,0 +1,34 @@
+"""Sinh khoá private PEM cho việc ký access token.
+
+    python -m app.scripts.generate_jwt_key --algorithm RS256 --out keys/jwt-2026-10.pem
+
+Xoay vòng khoá: thêm file mới vào đầu ``JWT_PRIVATE_KEYS``, chuyển khoá cũ sang
+cuối danh sách (hoặc ``JWT_PUBLIC_KEYS``) cho tới khi các token cũ hết hạn.
+"""
+import argparse
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sinh khoá ký JWT")
+    parser.add_argument("--algorithm", choices=["RS256", "ES256"], default="RS256")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+    if args.algorithm == "RS256":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        key = ec.generate_private_key(ec.SECP256R1())
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    with open(args.out, "wb") as f:
+        f.write(pem)
+    print(f"Đã ghi khoá {args.algorithm} vào {args.out}")
+
+
+if __name__ == "__main__":
+    main()
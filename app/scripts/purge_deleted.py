@@ -0,0 +1,29 @@
+"""Xoá hẳn các bản ghi đã xoá mềm quá hạn lưu giữ.
+
+Cùng logic với job nền chạy trong app (``PURGE_INTERVAL_SECONDS``), dùng khi muốn
+chạy bằng cron hoặc tắt job nền.
+
+    python -m app.scripts.purge_deleted --retention-days 30 --batch-size 1000
+"""
+import argparse
+
+from app.core.config import settings
+from app.db.purge import purge_soft_deleted
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Purge bản ghi đã xoá mềm")
+    parser.add_argument("--retention-days", type=int, default=settings.soft_delete_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.purge_batch_size)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    purged = purge_soft_deleted(retention_days=args.retention_days, batch_size=args.batch_size)
+    for table, count in purged.items():
+        print(f"{table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Dựng lại toàn bộ bảng ``role_closure`` từ ``role_parents``.
+
+Dùng khi triển khai cây kế thừa role lần đầu (sinh dòng ``(r, r)`` cho các role đã
+có) hoặc khi nghi ngờ closure lệch với các cạnh. Bình thường closure được cập nhật
+tăng dần bởi API, không cần chạy lệnh này.
+
+    python -m app.scripts.rebuild_role_closure --batch-size 5000
+"""
+import argparse
+import time
+
+from sqlalchemy import delete, insert, select
+
+from app.core.role_hierarchy import build_closure
+from app.db.database import engine
+from app.models.role import Role, role_closure, role_parents
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Dựng lại role_closure từ role_parents")
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    return parser.parse_args(argv)
+
+
+def rebuild(bind=engine, batch_size: int = 5_000) -> int:
+    # Một transaction: API đọc closure không thấy trạng thái dựng dở
+    with bind.begin() as conn:
+        role_ids = conn.execute(select(Role.id)).scalars().all()
+        edges = conn.execute(select(role_parents.c.role_id, role_parents.c.parent_id)).all()
+        closure = sorted(build_closure(role_ids, edges))
+        conn.execute(delete(role_closure))
+        for lo in range(0, len(closure), batch_size):
+            conn.execute(insert(role_closure), [
+                {"ancestor_id": a, "descendant_id": d} for a, d in closure[lo:lo + batch_size]
+            ])
+    return len(closure)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    total = rebuild(batch_size=args.batch_size)
+    print(f"role_closure: {total} dòng sau {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
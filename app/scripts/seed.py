@@ -0,0 +1,160 @@
+"""Sinh dữ liệu lớn để kiểm thử ở quy mô production.
+
+Chèn permission, role, user cùng các bảng liên kết ``role_permissions``,
+``role_parents`` và ``user_roles`` theo từng lô, mỗi lô một transaction; cuối cùng
+dựng lại ``role_closure`` từ các cạnh kế thừa. Dữ liệu được xác định hoàn
+toàn bởi ``--seed`` và chỉ số của bản ghi (``seed.user.<i>``, ``seed.role.<i>``,
+...), nên chạy lại lệnh sẽ tiếp tục từ lô cuối cùng đã commit.
+
+    python -m app.scripts.seed --users 1000000 --permissions 50000 --roles 5000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import func, insert, select
+
+from app.core.security import get_password_hash
+from app.db.database import Base, engine
+from app.scripts.rebuild_role_closure import rebuild as rebuild_role_closure
+from app.models.permission import Permission
+from app.models.role import Role, role_parents, role_permissions
+from app.models.user import User, user_roles
+from app.utils.time import get_vietnam_time
+
+PREFIX = "seed"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu lớn cho kiểm thử quy mô")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--permissions", type=int, default=50_000)
+    parser.add_argument("--roles", type=int, default=5_000)
+    parser.add_argument("--roles-per-user", type=int, default=3)
+    parser.add_argument("--permissions-per-role", type=int, default=200)
+    parser.add_argument("--parents-per-role", type=int, default=1, help="Số role cha, chọn trong các role có chỉ số nhỏ hơn")
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="seed-password", help="Mật khẩu chung, chỉ hash một lần")
+    parser.add_argument("--create-tables", action="store_true", help="Tạo bảng nếu chưa có (không dùng Alembic)")
+    return parser.parse_args(argv)
+
+
+def count_seeded(conn, column) -> int:
+    return conn.execute(select(func.count()).where(column.like(f"{PREFIX}.%"))).scalar_one()
+
+
+def load_ids(conn, model, name_column) -> list:
+    # Trả về id theo đúng thứ tự chỉ số trong tên (seed.xxx.<i>)
+    rows = conn.execute(select(name_column, model.id).where(name_column.like(f"{PREFIX}.%"))).all()
+    ids = [None] * len(rows)
+    for name, id_ in rows:
+        ids[int(name.rsplit(".", 1)[1])] = id_
+    return ids
+
+
+def sample(rng: random.Random, population: list, k: int) -> list:
+    return rng.sample(population, min(k, len(population)))
+
+
+def batches(start: int, total: int, size: int):
+    for lo in range(start, total, size):
+        yield lo, min(lo + size, total)
+
+
+def report(label: str, done: int, total: int, start: int, started: float):
+    rate = (done - start) / max(time.perf_counter() - started, 1e-9)
+    print(f"{label}: {done}/{total} ({rate:,.0f} dòng/giây)", flush=True)
+
+
+def seed_permissions(args):
+    with engine.connect() as conn:
+        start = count_seeded(conn, Permission.name)
+    started = time.perf_counter()
+    for lo, hi in batches(start, args.permissions, args.batch_size):
+        now = get_vietnam_time()
+        with engine.begin() as conn:
+            conn.execute(insert(Permission), [
+                {"name": f"{PREFIX}.perm.{i}", "description": f"Permission {i}", "created_at": now, "updated_at": now}
+                for i in range(lo, hi)
+            ])
+        report("permissions", hi, args.permissions, start, started)
+
+
+def seed_roles(args, permission_ids: list):
+    with engine.connect() as conn:
+        start = count_seeded(conn, Role.name)
+        role_ids = load_ids(conn, Role, Role.name)
+    started = time.perf_counter()
+    for lo, hi in batches(start, args.roles, args.batch_size):
+        now = get_vietnam_time()
+        with engine.begin() as conn:
+            names = [f"{PREFIX}.role.{i}" for i in range(lo, hi)]
+            conn.execute(insert(Role), [
+                {"name": name, "description": f"Role {i}", "created_at": now, "updated_at": now}
+                for i, name in zip(range(lo, hi), names)
+            ])
+            ids = dict(conn.execute(select(Role.name, Role.id).where(Role.name.in_(names))).all())
+            role_ids.extend(ids[name] for name in names)
+            rows, edges = [], []
+            for i, name in zip(range(lo, hi), names):
+                rng = random.Random(f"{args.seed}:role:{i}")
+                rows.extend({"role_id": ids[name], "permission_id": p} for p in sample(rng, permission_ids, args.permissions_per_role))
+                # Cha luôn có chỉ số nhỏ hơn nên cây kế thừa không có vòng
+                edges.extend({"role_id": ids[name], "parent_id": role_ids[j]} for j in sample(rng, range(i), args.parents_per_role))
+            if rows:
+                conn.execute(insert(role_permissions), rows)
+            if edges:
+                conn.execute(insert(role_parents), edges)
+        report("roles", hi, args.roles, start, started)
+
+
+def seed_users(args, role_ids: list):
+    with engine.connect() as conn:
+        start = count_seeded(conn, User.username)
+    hashed_password = get_password_hash(args.password)
+    started = time.perf_counter()
+    for lo, hi in batches(start, args.users, args.batch_size):
+        now = get_vietnam_time()
+        with engine.begin() as conn:
+            names = [f"{PREFIX}.user.{i}" for i in range(lo, hi)]
+            conn.execute(insert(User), [
+                {
+                    "username": name,
+                    "email": f"{name}@example.com",
+                    "hashed_password": hashed_password,
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for name in names
+            ])
+            ids = dict(conn.execute(select(User.username, User.id).where(User.username.in_(names))).all())
+            rows = []
+            for i, name in zip(range(lo, hi), names):
+                rng = random.Random(f"{args.seed}:user:{i}")
+                rows.extend({"user_id": ids[name], "role_id": r} for r in sample(rng, role_ids, args.roles_per_user))
+            if rows:
+                conn.execute(insert(user_roles), rows)
+        report("users", hi, args.users, start, started)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.create_tables:
+        import app.models  # noqa: F401  đăng ký toàn bộ bảng vào metadata
+        Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    seed_permissions(args)
+    with engine.connect() as conn:
+        permission_ids = load_ids(conn, Permission, Permission.name)
+    seed_roles(args, permission_ids)
+    print(f"role_closure: {rebuild_role_closure(engine, args.batch_size)} dòng", flush=True)
+    with engine.connect() as conn:
+        role_ids = load_ids(conn, Role, Role.name)
+    seed_users(args, role_ids)
+    print(f"Hoàn tất sau {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
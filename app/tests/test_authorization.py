@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core.authorization import PermissionResolver
+from app.core.redis_cache import RedisCache
+from app.db.database import Base
+from app.models.permission import Permission
+from app.models.role import Role, role_closure, role_permissions
+from app.models.user import User, user_roles
+
+
+def test_revoke_reaches_other_worker(tmp_path):
+    # Hai resolver dùng chung một Redis đóng vai hai worker; thu hồi ở worker A phải có hiệu lực ngay ở B
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'authz.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User).values(id=1, username="u", email="u@example.com", hashed_password="x"))
+            await conn.execute(insert(Role).values(id=1, name="r"))
+            await conn.execute(insert(Permission).values(id=1, name="role.read"))
+            await conn.execute(insert(role_closure).values(ancestor_id=1, descendant_id=1))
+            await conn.execute(insert(role_permissions).values(role_id=1, permission_id=1))
+            await conn.execute(insert(user_roles).values(user_id=1, role_id=1))
+
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        worker_a = PermissionResolver(RedisCache(client=redis), ttl=600, local_ttl=30)
+        worker_b = PermissionResolver(RedisCache(client=redis), ttl=600, local_ttl=30)
+        async with async_sessionmaker(engine)() as db:
+            assert await worker_a.has_permissions(db, 1, ["role.read"])
+            assert await worker_b.has_permissions(db, 1, ["role.read"])
+
+            await db.execute(role_permissions.delete())
+            await db.commit()
+            await worker_a.invalidate_users(1)
+
+            assert not await worker_a.has_permissions(db, 1, ["role.read"])
+            assert not await worker_b.has_permissions(db, 1, ["role.read"])
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.core.catalog_cache import CatalogCache
+from app.core.etag import ROLES, ChangeVersions
+from app.core.redis_cache import RedisCache
+
+
+def test_local_tier_skips_entries_older_than_version():
+    # Worker B không chạy listener (mô phỏng tin pub/sub chưa tới) nhưng vẫn không được trả dữ liệu cũ
+    async def scenario():
+        cache = RedisCache(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+        worker_a = CatalogCache(cache, ChangeVersions(cache), local_ttl=30, local_max_entries=100, redis_ttl=300)
+        worker_b = CatalogCache(cache, ChangeVersions(cache), local_ttl=30, local_max_entries=100, redis_ttl=300)
+        data = {"v": "old"}
+
+        async def load():
+            return dict(data)
+
+        assert await worker_b.get(ROLES, "k", load) == {"v": "old"}
+        data["v"] = "new"
+        await worker_a.invalidate(ROLES)
+
+        assert await worker_b.get(ROLES, "k", load) == {"v": "new"}
+        assert await worker_b.get(ROLES, "k", load, version=1) == {"v": "new"}
+
+    asyncio.run(scenario())
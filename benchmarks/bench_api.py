@@ -0,0 +1,244 @@
+"""Benchmark in-process cho các router của app.main.app.
+
+Gửi request qua ``httpx.ASGITransport`` (không qua mạng) tới một database SQLite
+tạm đã seed sẵn (hoặc database MySQL local còn trống qua ``--database-url``), đo throughput và
+p50/p95/p99 cho từng kịch bản với số request đồng thời cấu hình được, rồi ghi
+kết quả JSON để so sánh giữa các lần chạy.
+
+    python -m benchmarks.bench_api --requests 500 --concurrency 16 --output bench.json
+    python -m benchmarks.bench_api --compare bench.json --output bench_new.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+PASSWORD = "bench-password"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark in-process cho API")
+    parser.add_argument("--database-url", help="Mặc định tạo file SQLite tạm")
+    parser.add_argument("--requests", type=int, default=300, help="Số request cho mỗi kịch bản")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="Số request khởi động (không tính) cho mỗi kịch bản")
+    parser.add_argument("--permissions", type=int, default=500, help="Số permission seed sẵn")
+    parser.add_argument("--roles", type=int, default=50, help="Số role seed sẵn")
+    parser.add_argument("--scenarios", help="Danh sách kịch bản, phân tách bởi dấu phẩy (mặc định: tất cả)")
+    parser.add_argument("--real-redis", action="store_true", help="Dùng REDIS_URL thật thay vì fakeredis")
+    parser.add_argument("--output", help="File JSON ghi kết quả")
+    parser.add_argument("--compare", help="File JSON kết quả trước đó để so sánh")
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": ms(statistics.fmean(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+async def run_scenario(client, make_request, total, concurrency, warmup):
+    # Chỉ số i chạy liên tục qua cả warmup để các kịch bản tạo mới không bị trùng tên
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker(limit, record):
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= limit:
+                return
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            elapsed = time.perf_counter() - started
+            if not record:
+                continue
+            latencies.append(elapsed)
+            ok = response.status_code == 200
+            if ok and response.headers.get("content-type", "").startswith("application/json"):
+                ok = response.json().get("code") == 200
+            if not ok:
+                errors += 1
+
+    await asyncio.gather(*(worker(warmup, False) for _ in range(concurrency)))
+    counter = itertools.count(warmup)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(warmup + total, True) for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def seed(args):
+    from sqlalchemy import insert
+
+    from app.core.security import get_password_hash
+    from app.db.database import Base, SessionLocal, engine
+    from app.models.permission import Permission
+    from app.models.role import Role, role_permissions
+    from app.models.user import User, user_roles
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.execute(insert(Permission), [{"name": f"bench.perm.{i}", "description": "seed"} for i in range(args.permissions)])
+        db.execute(insert(Role), [{"name": f"bench.role.{i}", "description": "seed"} for i in range(args.roles)])
+        db.execute(insert(User), [{"username": "bench", "email": "bench@example.com", "hashed_password": get_password_hash(PASSWORD)}])
+        db.flush()
+        permission_ids = [p.id for p in db.query(Permission.id).order_by(Permission.id)]
+        role_ids = [r.id for r in db.query(Role.id).order_by(Role.id)]
+        user_id = db.query(User.id).filter(User.username == "bench").scalar()
+        # Mỗi role giữ 1/10 số permission; role đầu tiên dùng cho kịch bản gán/huỷ quyền nên để trống
+        db.execute(insert(role_permissions), [
+            {"role_id": r, "permission_id": p}
+            for n, r in enumerate(role_ids[1:], start=1)
+            for p in permission_ids[n % 10::10]
+        ])
+        db.execute(insert(user_roles), [{"user_id": user_id, "role_id": r} for r in role_ids[1:6]])
+        db.commit()
+    return {"permission_ids": permission_ids, "role_ids": role_ids}
+
+
+def build_scenarios(data, token, run_id):
+    permission_ids, role_ids = data["permission_ids"], data["role_ids"]
+    auth = {"Authorization": f"Bearer {token}"}
+    credentials = {"username": "bench", "email": "bench@example.com", "password": PASSWORD}
+    toggle_role = role_ids[0]
+
+    def pick(ids, i):
+        return ids[i % len(ids)]
+
+    async def add_remove_permission(client, i):
+        # Gán rồi huỷ ngay trong cùng một lượt (đo tổng 2 request) để các worker không giẫm lên nhau
+        permission_id = pick(permission_ids, i)
+        response = await client.post(f"/role/{toggle_role}/permissions/{permission_id}?return_permissions=false")
+        if response.json().get("code") != 200:
+            return response
+        return await client.delete(f"/role/{toggle_role}/permissions/{permission_id}?return_permissions=false")
+
+    return {
+        "register": lambda c, i: c.post("/auth/register", json={
+            "username": f"u{run_id}_{i}", "email": f"u{run_id}_{i}@example.com", "password": PASSWORD,
+        }),
+        "login": lambda c, i: c.post("/auth/login", json=credentials),
+        "me": lambda c, i: c.get("/auth/me", headers=auth),
+        "permission_create": lambda c, i: c.post("/permission/", json={"name": f"p{run_id}_{i}"}),
+        "permission_list": lambda c, i: c.get("/permission/?limit=100"),
+        "permission_get": lambda c, i: c.get(f"/permission/{pick(permission_ids, i)}"),
+        "permission_update": lambda c, i: c.put(f"/permission/{pick(permission_ids, i)}", json={
+            "name": f"bench.perm.{i % len(permission_ids)}", "description": f"v{i}",
+        }),
+        "role_create": lambda c, i: c.post("/role/", json={"name": f"r{run_id}_{i}"}),
+        "role_list": lambda c, i: c.get("/role/?limit=100"),
+        "role_get": lambda c, i: c.get(f"/role/{pick(role_ids, i)}"),
+        "role_permissions": lambda c, i: c.get(f"/role/{pick(role_ids[1:], i)}/permissions"),
+        "role_permission_add_remove": add_remove_permission,
+        "role_permissions_put": lambda c, i: c.put(f"/role/{pick(role_ids[1:], i)}/permissions", json={
+            "permission_ids": permission_ids[i % 10::10][:20], "mode": "replace", "return_permissions": False,
+        }),
+    }
+
+
+def compare(previous, current):
+    lines = [f"{'scenario':<24}{'rps old':>10}{'rps new':>10}{'Δ%':>8}{'p95 old':>10}{'p95 new':>10}{'Δ%':>8}"]
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if not old:
+            continue
+        delta = lambda a, b: f"{(b - a) / a * 100:+.1f}" if a and b is not None else "-"
+        lines.append(
+            f"{name:<24}{old['throughput_rps']:>10}{result['throughput_rps']:>10}{delta(old['throughput_rps'], result['throughput_rps']):>8}"
+            f"{old['p95_ms']:>10}{result['p95_ms']:>10}{delta(old['p95_ms'], result['p95_ms']):>8}"
+        )
+    return "\n".join(lines)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def main(args):
+    import httpx
+
+    from app.core.config import settings
+    from app.core.password_pool import password_pool
+    from app.core.redis_cache import redis_cache
+    from app.main import app
+
+    if not args.real_redis:
+        import fakeredis
+
+        redis_cache.set_client(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    data = seed(args)
+    run_id = int(time.time())
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        login = await client.post("/auth/login", json={"username": "bench", "email": "bench@example.com", "password": PASSWORD})
+        token = login.json()["data"]["access_token"]
+        scenarios = build_scenarios(data, token, run_id)
+        selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+        for name in selected:
+            result = await run_scenario(client, scenarios[name], args.requests, args.concurrency, args.warmup)
+            results[name] = result
+            print(f"{name:<24} {result['throughput_rps']:>9} rps  p50 {result['p50_ms']:>8} ms  "
+                  f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  errors {result['errors']}")
+    password_pool.shutdown()
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "database": settings.database_url.split("@")[-1],
+            "db_async": settings.db_async,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "permissions": args.permissions,
+            "roles": args.roles,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Phải đặt DATABASE_URL trước khi import app vì engine được tạo lúc import
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+    # Các kịch bản login/register lặp lại cùng IP/username nên tắt rate limit trừ khi được đặt rõ
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), report))
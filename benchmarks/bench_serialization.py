@@ -0,0 +1,79 @@
+"""So sánh đường serialize mặc định của FastAPI với ``EnvelopeRoute``.
+
+Hai app giống hệt nhau trả về cùng một ``APIResponse`` chứa trang ``PermissionRead``
+(không truy vấn DB), một app dùng ``APIRoute`` + ``JSONResponse`` mặc định, app
+còn lại dùng ``EnvelopeRoute`` + ``APIJSONResponse``. Chỉ đo phần validate lại và
+serialize kết quả.
+
+    python -m benchmarks.bench_serialization --items 500 --requests 300
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.bench_api import summarize
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serialize APIResponse")
+    parser.add_argument("--items", type=int, default=500, help="Số phần tử mỗi trang")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    return parser.parse_args(argv)
+
+
+def build_app(envelope: bool, page):
+    from fastapi import APIRouter, FastAPI
+
+    from app.core.helpers import APIResponse
+    from app.core.responses import APIJSONResponse, EnvelopeRoute
+
+    if envelope:
+        app = FastAPI(default_response_class=APIJSONResponse)
+        router = APIRouter(route_class=EnvelopeRoute)
+    else:
+        app = FastAPI()
+        router = APIRouter()
+
+    @router.get("/items", response_model=APIResponse)
+    async def items():
+        return APIResponse(data=page)
+
+    app.include_router(router)
+    return app
+
+
+async def measure(app, total, warmup):
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(warmup):
+            await client.get("/items")
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(total):
+            t = time.perf_counter()
+            response = await client.get("/items")
+            latencies.append(time.perf_counter() - t)
+            response.raise_for_status()
+        return response.content, summarize(latencies, 0, time.perf_counter() - started)
+
+
+async def main(args):
+    from app.schemas.pagination import Page
+    from app.schemas.permission import PermissionRead
+
+    page = Page[PermissionRead](
+        items=[PermissionRead(id=i, name=f"bench.perm.{i}", description=f"Permission {i}") for i in range(args.items)],
+        next_cursor=args.items,
+    )
+    default_body, default = await measure(build_app(False, page), args.requests, args.warmup)
+    envelope_body, envelope = await measure(build_app(True, page), args.requests, args.warmup)
+    assert default_body.replace(b" ", b"") == envelope_body.replace(b" ", b""), "Hai đường serialize cho kết quả khác nhau"
+    for name, result in (("default", default), ("envelope", envelope)):
+        print(f"{name:<10} {result['throughput_rps']:>9} rps  p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms")
+    print(f"speedup p50: x{default['p50_ms'] / envelope['p50_ms']:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))